@@ -0,0 +1,68 @@
+ALARM_SINKS = ("pygame", "gpio", "log")
+
+
+class LogAlarm:
+    def __init__(self, name="driver"):
+        self.name = name
+
+    def play(self, loops=-1):
+        print(f"[ALARM] {self.name} drowsy", flush=True)
+
+    def stop(self):
+        print(f"[OK] {self.name} awake", flush=True)
+
+
+class PygameAlarm:
+    def __init__(self, path="alarm.wav"):
+        import pygame
+        pygame.mixer.init()
+        pygame.mixer.music.load(path)
+        self.music = pygame.mixer.music
+
+    def play(self, loops=-1):
+        self.music.play(loops)
+
+    def stop(self):
+        self.music.stop()
+
+
+class GpioAlarm:
+    # Drives a buzzer or relay on a Raspberry Pi pin (BCM numbering). Without
+    # RPi.GPIO, e.g. on a development machine, pin changes are only printed.
+    def __init__(self, pin=18):
+        self.pin = pin
+        try:
+            import RPi.GPIO as GPIO
+        except ImportError:
+            print(f"[alarm] RPi.GPIO not available, simulating pin {pin}", flush=True)
+            self.gpio = None
+            return
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(pin, GPIO.OUT, initial=GPIO.LOW)
+        self.gpio = GPIO
+
+    def _set(self, high):
+        if self.gpio is None:
+            print(f"[alarm] pin {self.pin} {'HIGH' if high else 'LOW'}", flush=True)
+        else:
+            self.gpio.output(self.pin, self.gpio.HIGH if high else self.gpio.LOW)
+
+    def play(self, loops=-1):
+        self._set(True)
+
+    def stop(self):
+        self._set(False)
+
+
+def make_alarm(opt):
+    if opt.alarm == "pygame":
+        return PygameAlarm(opt.alarm_file)
+    if opt.alarm == "gpio":
+        return GpioAlarm(opt.gpio_pin)
+    return LogAlarm()
+
+
+def add_alarm_args(parser, default="pygame"):
+    parser.add_argument("--alarm", choices=ALARM_SINKS, default=default, help="where drowsiness alarms go")
+    parser.add_argument("--alarm-file", type=str, default="alarm.wav", help="sound played by the pygame alarm")
+    parser.add_argument("--gpio-pin", type=int, default=18, help="BCM pin driven by the gpio alarm")
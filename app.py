@@ -0,0 +1,148 @@
+from startup import StartupTimer
+import argparse
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from db import init_db, start_event_writer, stop_event_writer
+from backends import add_backend_args
+from mp_worker import add_mp_args, load_inference
+from roi import add_roi_args
+from scheduler import add_scheduler_args
+from capture import add_capture_args, open_camera
+from metrics import add_metrics_args, start_metrics
+from recorder import add_recorder_args
+from governor import add_governor_args
+
+
+def build_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--user", type=str, default="unknown")
+    parser.add_argument("--display-fps", type=float, default=30.0, help="maximum preview refresh rate")
+    add_backend_args(parser)
+    add_scheduler_args(parser)
+    add_mp_args(parser)
+    add_roi_args(parser)
+    add_capture_args(parser)
+    add_metrics_args(parser)
+    add_recorder_args(parser)
+    add_governor_args(parser)
+    return parser
+
+
+class App:
+    def __init__(self, opt):
+        self.opt = opt
+        self.timer = StartupTimer()
+        start_metrics(opt)
+        with self.timer.phase("db_init"):
+            init_db()
+            start_event_writer()
+        with self.timer.phase("tk_init"):
+            self.root = tk.Tk()
+            self.root.title("Driver Drowsiness Detection")
+            self.root.configure(bg="#1e1e2f")
+            self.root.protocol("WM_DELETE_WINDOW", self.quit)
+        self.view = None
+        # quality level the latency governor had reached, carried across trips
+        self.governor_level = 0
+        self._close_view = None
+
+        # Heavy imports and model loading run in order on one background
+        # thread while the first screen is already on screen; the camera
+        # opens on its own thread so the preview does not wait for YOLO.
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="startup")
+        self._camera_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="camera")
+        self._cap = self._camera_loader.submit(self._open_camera)
+        self._model = self._loader.submit(self._load_model)
+        self._face_index = self._loader.submit(self._load_face_index)
+        self._alarm = self._loader.submit(self._load_alarm)
+        self._loader.submit(self._report_startup)
+
+    def _load_model(self):
+        with self.timer.phase(f"load_{self.opt.backend}_backend"):
+            backend = load_inference(self.opt)
+        with self.timer.phase("model_warmup"):
+            # The first predict call builds the graph and allocates buffers;
+            # doing it here keeps that spike off the first real frame.
+            backend.predict([np.zeros((480, 640, 3), np.uint8)])
+        return backend
+
+    def _load_face_index(self):
+        with self.timer.phase("import_face_recognition"):
+            import face_recognition  # noqa: F401
+        with self.timer.phase("face_index"):
+            from face_index import FaceIndex
+            return FaceIndex.from_db()
+
+    def _load_alarm(self):
+        with self.timer.phase("alarm"):
+            import pygame
+            pygame.mixer.init()
+            pygame.mixer.music.load("alarm.wav")
+            return pygame.mixer.music
+
+    def _open_camera(self):
+        with self.timer.phase("camera_open"):
+            return open_camera(self.opt)
+
+    def _report_startup(self):
+        self._cap.exception()
+        self.timer.report()
+
+    def camera_ready(self):
+        return self._cap.done()
+
+    def camera(self):
+        return self._cap.result()
+
+    def model(self):
+        return self._model.result()
+
+    def face_index(self):
+        return self._face_index.result()
+
+    def alarm(self):
+        return self._alarm.result()
+
+    def center(self, width, height):
+        x = (self.root.winfo_screenwidth() - width) // 2
+        y = (self.root.winfo_screenheight() - height) // 2
+        self.root.geometry(f"{width}x{height}+{x}+{y}")
+
+    def show(self, build, *args):
+        self._close_current()
+        self.view, self._close_view = build(self, *args)
+        self.view.pack(fill="both", expand=True)
+
+    def show_login(self):
+        from main import build_login_view
+        self.show(build_login_view)
+
+    def show_drive(self, user):
+        from drowsiness_detection import build_drive_view
+        self.show(build_drive_view, user)
+
+    def show_admin(self, user):
+        from admin_panel import build_admin_view
+        self.show(build_admin_view, user)
+
+    def _close_current(self):
+        if self._close_view:
+            self._close_view()
+        if self.view:
+            self.view.destroy()
+        self.view, self._close_view = None, None
+
+    def quit(self):
+        self._close_current()
+        if self._cap.done() and self._cap.exception() is None:
+            self._cap.result().release()
+        stop_event_writer()
+        self._loader.shutdown(wait=False, cancel_futures=True)
+        self._camera_loader.shutdown(wait=False)
+        self.root.quit()
+        self.root.destroy()
+
+    def run(self):
+        self.root.after_idle(lambda: self.timer.mark("first_screen"))
+        self.root.mainloop()
@@ -0,0 +1,124 @@
+import os
+import shutil
+import time
+import cv2
+import numpy as np
+from detection import extract_detections, detections_from_arrays
+from metrics import stage_timer
+
+INFERENCE_SECONDS = stage_timer("inference")
+POSTPROCESS_SECONDS = stage_timer("postprocess")
+
+BACKENDS = ("torch", "onnx", "openvino", "stub")
+
+
+def _is_stale(artifact, weights):
+    return not os.path.exists(artifact) or os.path.getmtime(artifact) < os.path.getmtime(weights)
+
+
+def export_model(weights, fmt, imgsz=640, int8=False, data=None):
+    # Exports once per (format, input size, precision) and reuses the cached
+    # artifact next to the weights until the .pt file changes.
+    stem = os.path.splitext(weights)[0]
+    suffix = f"_{imgsz}" + ("_int8" if int8 else "")
+    if fmt == "onnx":
+        artifact = f"{stem}{suffix}.onnx"
+    elif fmt == "openvino":
+        artifact = f"{stem}{suffix}_openvino_model"
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if not _is_stale(artifact, weights):
+        return artifact
+
+    from ultralytics import YOLO
+    print(f"[backend] exporting {weights} to {artifact}", flush=True)
+    model = YOLO(weights)
+    if fmt == "onnx":
+        exported = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(exported, artifact, weight_type=QuantType.QUInt8)
+            os.remove(exported)
+        else:
+            shutil.move(exported, artifact)
+    else:
+        kwargs = {}
+        if int8:
+            # OpenVINO calibrates INT8 on real images; without `data`
+            # ultralytics would download and calibrate on COCO instead.
+            if not data or not os.path.exists(data):
+                raise FileNotFoundError(f"INT8 calibration dataset not found: {data} (see --int8-data)")
+            kwargs["data"] = data
+        exported = model.export(format="openvino", imgsz=imgsz, dynamic=True, int8=int8, **kwargs)
+        if os.path.exists(artifact):
+            shutil.rmtree(artifact)
+        shutil.move(exported, artifact)
+    return artifact
+
+
+class Backend:
+    def __init__(self, name, weights, device="cpu", imgsz=640, conf=0.25, int8=False, int8_data=None):
+        from ultralytics import YOLO
+        self.name = name
+        self.device = device
+        self.imgsz = imgsz
+        self.conf = conf
+        path = weights if name == "torch" else export_model(weights, name, imgsz, int8, int8_data)
+        # ultralytics runs .onnx files through ONNX Runtime and *_openvino_model
+        # directories through OpenVINO, with the same NMS and Results objects,
+        # so every backend yields identical Detections for the fatigue logic.
+        self.model = YOLO(path, task="detect")
+        self.names = self.model.names
+
+    def predict(self, frames, imgsz=None):
+        with INFERENCE_SECONDS.time():
+            results = self.model.predict(source=frames, conf=self.conf, imgsz=imgsz or self.imgsz,
+                                         device=self.device, verbose=False)
+        with POSTPROCESS_SECONDS.time():
+            return extract_detections(results, self.names)
+
+
+class StubBackend:
+    # Deterministic stand-in for CI and benchmarks: a frame whose centre is
+    # darker than `threshold` counts as drowsy, anything else as awake, with
+    # one box over the centre and an optional fixed per-frame latency.
+    name = "stub"
+    names = {0: "awake", 1: "drowsy"}
+    imgsz = None
+
+    def __init__(self, threshold=80, latency=0.0):
+        self.threshold = threshold
+        self.latency = latency
+
+    def predict(self, frames, imgsz=None):
+        t0 = time.perf_counter()
+        rows = []
+        for frame in frames:
+            h, w = frame.shape[:2]
+            x1, y1, x2, y2 = w // 4, h // 4, 3 * w // 4, 3 * h // 4
+            gray = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+            cls = 1 if gray.mean() < self.threshold else 0
+            rows.append([x1, y1, x2, y2, 0.9, cls])
+        if self.latency:
+            time.sleep(self.latency * len(frames))
+        INFERENCE_SECONDS.observe(time.perf_counter() - t0)
+        return detections_from_arrays(np.array(rows, np.float32).reshape(-1, 6), [1] * len(frames), self.names)
+
+
+def load_backend(opt):
+    if opt.backend == "stub":
+        return StubBackend(latency=opt.stub_latency / 1000.0)
+    return Backend(opt.backend, opt.weights, device=opt.device, imgsz=opt.imgsz, conf=opt.conf_thres, int8=opt.int8,
+                   int8_data=opt.int8_data)
+
+
+def add_backend_args(parser):
+    parser.add_argument("--weights", type=str, default="yolov8.pt", help="YOLOv8 weights of the drowsiness detector")
+    parser.add_argument("--device", type=str, default="cpu", help="torch device, e.g. cpu or 0")
+    parser.add_argument("--conf-thres", type=float, default=0.25, help="minimum detection confidence")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch", help="inference runtime for the detector")
+    parser.add_argument("--imgsz", type=int, default=640, help="model input size")
+    parser.add_argument("--int8", action="store_true", help="quantize exported onnx/openvino models to INT8")
+    parser.add_argument("--int8-data", type=str, default="tools/yolov8/data.yaml",
+                        help="dataset yaml whose images calibrate OpenVINO INT8 export")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="simulated per-frame cost of the stub backend in ms")
@@ -0,0 +1,183 @@
+import threading
+import time
+import cv2
+import numpy as np
+from pipeline import RateMeter
+from metrics import counter, stage_timer
+
+CAPTURE_SECONDS = stage_timer("capture")
+FRAMES_CAPTURED = counter("frames_captured", "Frames decoded from the camera")
+FRAMES_MISSED = counter("camera_frames_missed", "Frames the camera or driver dropped before capture")
+
+
+class CaptureService(threading.Thread):
+    # Owns the camera and reads it continuously into a preallocated ring of
+    # `slots` frames. latest() hands out read-only views of the newest slot
+    # without copying; a view stays valid until `slots - 1` newer frames have
+    # been captured, so zero-copy readers must use it right away. read()
+    # keeps the cv2.VideoCapture interface and returns a private copy.
+    def __init__(self, source=0, width=640, height=480, fps=30, fourcc="MJPG", buffer_size=1, slots=4):
+        super().__init__(daemon=True)
+        self.source = source
+        self.cap = cv2.VideoCapture(source)
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if width and height:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+        # Keep the driver from queueing stale frames behind the newest one.
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or fps or 30.0
+
+        self.slots = slots
+        self.ring = None
+        self.stamps = np.zeros(slots, np.float64)
+        self.ids = np.full(slots, -1, np.int64)
+        self.frame_id = -1
+        self.missed = 0
+        self.skipped = {}
+        self.resolution = None
+        self._resize = None
+        self.meter = RateMeter()
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._local = threading.local()
+
+        # The first frame fixes the ring shape to what the device delivers,
+        # which may differ from the requested resolution.
+        ret, frame = self.cap.read()
+        if ret:
+            self._allocate(frame)
+
+    def _allocate(self, frame):
+        # The new ring gets the frame before it is swapped in, under the
+        # lock, so readers never index an unfilled slot. Readers still
+        # holding views of the old ring keep it alive.
+        ring = np.empty((self.slots,) + frame.shape, frame.dtype)
+        ring[(self.frame_id + 1) % self.slots] = frame
+        self._publish(ring)
+
+    def set_resolution(self, width, height):
+        # Applied by the capture thread between two reads.
+        if (width, height) != self.resolution:
+            self._resize = (width, height)
+
+    def _apply_resize(self):
+        width, height = self._resize
+        self._resize = None
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        ret, frame = self.cap.read()
+        if ret:
+            self._allocate(frame)
+
+    def isOpened(self):
+        return self.cap.isOpened() and self.ring is not None
+
+    def _publish(self, ring=None):
+        next_id = self.frame_id + 1
+        slot = next_id % self.slots
+        now = time.perf_counter()
+        if self.frame_id >= 0 and ring is None:
+            # Gaps well over one frame period mean the device or driver
+            # dropped frames before we got them; the pause while a new
+            # resolution is set up is not one.
+            gap = now - self.stamps[self.frame_id % self.slots]
+            if gap > 1.5 / self.fps:
+                missed = int(round(gap * self.fps)) - 1
+                self.missed += missed
+                FRAMES_MISSED.inc(missed)
+        with self._cond:
+            if ring is not None:
+                self.ring = ring
+                self.resolution = (ring.shape[2], ring.shape[1])
+            self.stamps[slot] = now
+            self.ids[slot] = next_id
+            self.frame_id = next_id
+            self._cond.notify_all()
+        self.meter.tick()
+        FRAMES_CAPTURED.inc()
+
+    def run(self):
+        while not self._stop_event.is_set() and self.ring is not None:
+            if self._resize is not None:
+                self._apply_resize()
+                continue
+            # Decode straight into the slot after the newest one, which no
+            # reader is being pointed at.
+            slot = (self.frame_id + 1) % self.slots
+            t0 = time.perf_counter()
+            ret, _ = self.cap.read(self.ring[slot])
+            if not ret:
+                time.sleep(0.01)
+                continue
+            CAPTURE_SECONDS.observe(time.perf_counter() - t0)
+            self._publish()
+
+    def latest(self):
+        with self._cond:
+            if self.frame_id < 0:
+                return -1, 0.0, None
+            slot = self.frame_id % self.slots
+            view = self.ring[slot]
+            view.flags.writeable = False
+            return int(self.ids[slot]), float(self.stamps[slot]), view
+
+    def read_stamped(self, timeout=1.0):
+        # Waits for a frame this thread has not seen yet; frames it never got
+        # to are counted per consumer thread.
+        last = getattr(self._local, "last_id", -1)
+        with self._cond:
+            if self.frame_id <= last:
+                self._cond.wait_for(lambda: self.frame_id > last or self._stop_event.is_set(), timeout)
+            if self.frame_id <= last:
+                return False, None, 0.0
+            slot = self.frame_id % self.slots
+            frame = self.ring[slot].copy()
+            frame_id, ts = int(self.ids[slot]), float(self.stamps[slot])
+        if last >= 0 and frame_id - last > 1:
+            name = threading.current_thread().name
+            self.skipped[name] = self.skipped.get(name, 0) + frame_id - last - 1
+        self._local.last_id = frame_id
+        return True, frame, ts
+
+    def read(self):
+        ret, frame, _ = self.read_stamped()
+        return ret, frame
+
+    def stop(self):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def release(self):
+        self.stop()
+        if self.is_alive():
+            self.join(1.0)
+        self.cap.release()
+
+    def stats(self):
+        return {
+            "captured": self.frame_id + 1,
+            "capture_fps": self.meter.fps,
+            "missed": self.missed,
+            "consumer_skipped": dict(self.skipped),
+        }
+
+
+def open_camera(opt):
+    service = CaptureService(opt.camera, width=opt.width, height=opt.height, fps=opt.camera_fps,
+                             fourcc=opt.fourcc, buffer_size=opt.camera_buffer)
+    service.start()
+    return service
+
+
+def add_capture_args(parser):
+    parser.add_argument("--camera", type=int, default=0, help="camera index")
+    parser.add_argument("--width", type=int, default=640, help="requested capture width")
+    parser.add_argument("--height", type=int, default=480, help="requested capture height")
+    parser.add_argument("--camera-fps", type=float, default=30.0, help="requested capture frame rate")
+    parser.add_argument("--fourcc", type=str, default="MJPG", help="camera pixel format, empty for the driver default")
+    parser.add_argument("--camera-buffer", type=int, default=1, help="driver-side frame buffer size")
@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from alarms import add_alarm_args, make_alarm
+from backends import add_backend_args
+from mp_worker import add_mp_args, load_inference
+from capture import add_capture_args, open_camera
+from detection import analyze_frame
+from db import init_db, flush_events, log_event, start_event_writer, stop_event_writer
+from fatigue import FatigueEngine, DRIVE, ALARM_ON, ALARM_OFF, FATIGUE_DETECTED, LOGGED_EVENTS, event_names
+from governor import add_governor_args, make_governor
+from metrics import PROFILER, add_metrics_args, gauge, start_metrics
+from recorder import add_recorder_args, make_recorder
+from roi import add_roi_args, wrap_backend
+from scheduler import InferenceScheduler, add_scheduler_args
+
+COMMANDS = ("start", "stop", "short_break", "long_break", "status")
+
+
+class Daemon:
+    # Headless drive loop for in-cab units: camera -> scheduled detection ->
+    # fatigue engine -> alarm sink, with no Tk and no rendering. Trips and
+    # breaks are controlled over the local command socket.
+    def __init__(self, camera, backend, alarm, opt, recorder=None):
+        self.camera = camera
+        self.backend = backend
+        self.alarm = alarm
+        self.recorder = recorder
+        self.opt = opt
+        self.driver = None
+        self.fatigue = None
+        self.scheduler = InferenceScheduler(interval=opt.infer_interval, motion_threshold=opt.motion_thres)
+        self.governor = make_governor(opt, self.scheduler, backend, camera)
+        self.frames = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        gauge("fatigue_level", "Current fatigue level").set_function(lambda: self.fatigue.level if self.fatigue else 0.0)
+        gauge("alarm_on", "1 while the drowsiness alarm is sounding").set_function(lambda: bool(self.fatigue and self.fatigue.alarm_on))
+        gauge("inference_ratio", "Share of frames sent to the model").set_function(lambda: self.scheduler.inference_ratio)
+
+    def _handle_events(self, events):
+        if events & ALARM_ON:
+            self.alarm.play(-1)
+        if events & ALARM_OFF:
+            self.alarm.stop()
+        clip = None
+        if self.recorder is not None and events & FATIGUE_DETECTED:
+            clip = self.recorder.trigger(self.driver)
+        for event in event_names(events & LOGGED_EVENTS):
+            log_event(self.driver, event, clip if event == "fatigue_detected" else None)
+
+    def start_trip(self, driver):
+        if self.driver is not None:
+            self.stop_trip()
+        with self._lock:
+            self.driver = driver
+            self.fatigue = FatigueEngine()
+            self.scheduler.alarm_ratio = self.fatigue.alarm_ratio
+            self.scheduler.reset()
+        log_event(driver, "start_trip")
+
+    def stop_trip(self):
+        with self._lock:
+            driver, fatigue = self.driver, self.fatigue
+            self.driver = None
+        if driver is None:
+            return
+        if fatigue.alarm_on:
+            self.alarm.stop()
+        log_event(driver, "stop_trip")
+        flush_events()
+
+    def toggle_break(self, kind):
+        with self._lock:
+            if self.driver is None:
+                return
+            now = time.monotonic()
+            if kind == "short_break":
+                events = self.fatigue.toggle_short_break(now)
+            else:
+                events = self.fatigue.toggle_long_break(now)
+            resumed = self.fatigue.mode == DRIVE
+            self._handle_events(events)
+        if resumed:
+            self.scheduler.reset()
+
+    def status(self):
+        with self._lock:
+            if self.driver is None:
+                return {"driving": False, "frames": self.frames, "camera": self.camera.stats()}
+            now = time.monotonic()
+            return {
+                "driving": True,
+                "driver": self.driver,
+                "mode": self.fatigue.mode,
+                "elapsed": round(self.fatigue.elapsed(now), 1),
+                "fatigue": round(self.fatigue.level, 1),
+                "alarm": self.fatigue.alarm_on,
+                "frames": self.frames,
+                "inference_ratio": round(self.scheduler.inference_ratio, 3),
+                "camera": self.camera.stats(),
+                "recorder": self.recorder.stats() if self.recorder is not None else None,
+                "governor_level": self.governor.level if self.governor is not None else None,
+            }
+
+    def command(self, line):
+        parts = line.split()
+        if not parts or parts[0] not in COMMANDS:
+            return {"ok": False, "error": f"expected one of {', '.join(COMMANDS)}"}
+        cmd = parts[0]
+        if cmd == "start":
+            self.start_trip(parts[1] if len(parts) > 1 else self.opt.user)
+        elif cmd == "stop":
+            self.stop_trip()
+        elif cmd in ("short_break", "long_break"):
+            self.toggle_break(cmd)
+        return {"ok": True, **self.status()}
+
+    def step(self):
+        ret, frame, captured = self.camera.read_stamped(timeout=0.5)
+        if not ret:
+            return
+        self.frames += 1
+        if self.recorder is not None:
+            self.recorder.add(frame)
+        driver, fatigue = self.driver, self.fatigue
+        if driver is None:
+            return
+        _, events = analyze_frame(frame, self.backend, self.scheduler, fatigue, time.monotonic(), self._lock)
+        with self._lock:
+            # The trip may have stopped or been replaced while the model ran;
+            # holding the lock keeps stop_trip from silencing the alarm
+            # before this step has raised it.
+            if self.driver is not driver or self.fatigue is not fatigue:
+                return
+            self._handle_events(events)
+        if self.governor is not None:
+            # capture-to-decision time, i.e. how late an alarm can fire
+            self.governor.observe(time.perf_counter() - captured)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                PROFILER.call(self.step)
+            except Exception as e:
+                print(f"[ERROR] daemon: {e}", flush=True)
+                time.sleep(0.1)
+
+    def shutdown(self):
+        self._stop_event.set()
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            line = raw.decode(errors="replace").strip()
+            if not line:
+                continue
+            reply = self.server.daemon_ref.command(line)
+            self.wfile.write((json.dumps(reply) + "\n").encode())
+
+
+def _tcp_address(control):
+    host, _, port = control.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def serve_commands(daemon, control):
+    # A filesystem socket where available, otherwise (or for "host:port")
+    # a TCP socket that should stay bound to localhost.
+    if ":" not in control and hasattr(socket, "AF_UNIX"):
+        if os.path.exists(control):
+            os.remove(control)
+        server = socketserver.ThreadingUnixStreamServer(control, _CommandHandler)
+    else:
+        server = socketserver.ThreadingTCPServer(_tcp_address(control), _CommandHandler)
+    server.daemon_threads = True
+    server.daemon_ref = daemon
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[daemon] listening for commands on {control}", flush=True)
+    return server
+
+
+def send_command(control, line):
+    if ":" not in control and hasattr(socket, "AF_UNIX"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(control)
+    else:
+        sock = socket.create_connection(_tcp_address(control))
+    with sock:
+        sock.sendall((line + "\n").encode())
+        return sock.makefile().readline().strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run drowsiness detection without a GUI")
+    parser.add_argument("--user", type=str, default="unknown", help="driver for a start command without a name")
+    parser.add_argument("--control", type=str, default="/tmp/drowsiness.sock",
+                        help="command socket path, or host:port for TCP")
+    parser.add_argument("--autostart", action="store_true", help="start a trip for --user right away")
+    parser.add_argument("--send", type=str, default=None, metavar="COMMAND",
+                        help="send a command (" + ", ".join(COMMANDS) + ") to a running daemon and exit")
+    add_backend_args(parser)
+    add_scheduler_args(parser)
+    add_mp_args(parser)
+    add_roi_args(parser)
+    add_capture_args(parser)
+    add_alarm_args(parser, default="log")
+    add_recorder_args(parser)
+    add_governor_args(parser)
+    add_metrics_args(parser)
+    opt = parser.parse_args()
+
+    if opt.send:
+        print(send_command(opt.control, opt.send))
+        return
+
+    start_metrics(opt)
+    init_db()
+    start_event_writer()
+    backend = wrap_backend(load_inference(opt), opt)
+    camera = open_camera(opt)
+    if not camera.isOpened():
+        print(f"[ERROR] cannot open camera {opt.camera}", flush=True)
+        stop_event_writer()
+        return
+    recorder = make_recorder(opt)
+    daemon = Daemon(camera, backend, make_alarm(opt), opt, recorder)
+    server = serve_commands(daemon, opt.control)
+    if opt.autostart:
+        daemon.start_trip(opt.user)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop_trip()
+        server.shutdown()
+        camera.release()
+        if recorder is not None:
+            recorder.close()
+        stop_event_writer()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,24 @@
 import sqlite3
+import threading
+import queue
+import time
+import atexit
 from datetime import datetime
 import json
+import numpy as np
+from metrics import counter, stage_timer
 
 DB_PATH = "database.db"
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_user_listeners = []
+
+def add_user_listener(callback):
+    _user_listeners.append(callback)
+
+def _notify_users(action, name, data):
+    for callback in _user_listeners:
+        callback(action, name, data)
 
 def get_connection():
     return sqlite3.connect(DB_PATH)
@@ -27,73 +43,418 @@ def init_db():
         )
     """)
     conn.commit()
+    migrate(conn)
     conn.close()
 
-def log_event(driver, event):
-    now = datetime.now()
+def _embedding_rows(embedding):
+    return np.asarray(embedding, np.float32).reshape(-1, 128)
+
+def _from_blob(blob):
+    return np.frombuffer(blob, dtype=np.float32)
+
+def _migrate_embeddings_to_blobs(conn):
+    conn.execute("""
+        CREATE TABLE embeddings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            vector BLOB NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX idx_embeddings_name ON embeddings (name)")
+    rows = conn.execute("SELECT name, embedding FROM users WHERE embedding IS NOT NULL").fetchall()
+    conn.executemany("INSERT INTO embeddings (name, vector) VALUES (?, ?)",
+                     [(name, _embedding_rows(json.loads(embedding))[0].tobytes()) for name, embedding in rows])
+    conn.execute("CREATE TABLE users_new (name TEXT PRIMARY KEY, role TEXT)")
+    conn.execute("INSERT INTO users_new (name, role) SELECT name, role FROM users")
+    conn.execute("DROP TABLE users")
+    conn.execute("ALTER TABLE users_new RENAME TO users")
+
+def _migrate_events_to_timestamps(conn):
+    conn.execute("""
+        CREATE TABLE events_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            driver TEXT,
+            event TEXT,
+            ts TEXT NOT NULL
+        )
+    """)
+    conn.execute("INSERT INTO events_new (id, driver, event, ts) "
+                 "SELECT id, driver, event, date || ' ' || time FROM events")
+    conn.execute("DROP TABLE events")
+    conn.execute("ALTER TABLE events_new RENAME TO events")
+    conn.execute("CREATE INDEX idx_events_ts ON events (ts)")
+    conn.execute("CREATE INDEX idx_events_driver_ts ON events (driver, ts)")
+    conn.execute("CREATE INDEX idx_events_event_ts ON events (event, ts)")
+
+STAT_EVENTS = ("start_trip", "stop_trip", "fatigue_detected")
+TRIP_EVENTS = ("start_trip", "stop_trip")
+
+def _rollup(rows, last_start=None):
+    # rows are (ts, event) ordered by time for one driver; returns
+    # {day: [trips, fatigue, drive_minutes]} with each trip's minutes
+    # counted on the day it stopped.
+    days = {}
+    for ts, event in rows:
+        day = days.setdefault(ts[:10], [0, 0, 0])
+        if event == "start_trip":
+            day[0] += 1
+            last_start = ts
+        elif event == "fatigue_detected":
+            day[1] += 1
+        elif event == "stop_trip" and last_start is not None:
+            elapsed = datetime.strptime(ts, TS_FORMAT) - datetime.strptime(last_start, TS_FORMAT)
+            day[2] += int(elapsed.total_seconds()) // 60
+            last_start = None
+    return days
+
+def _migrate_daily_stats(conn):
+    conn.execute("""
+        CREATE TABLE daily_stats (
+            driver TEXT NOT NULL,
+            day TEXT NOT NULL,
+            trips INTEGER NOT NULL DEFAULT 0,
+            fatigue INTEGER NOT NULL DEFAULT 0,
+            drive_minutes INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (driver, day)
+        )
+    """)
+    conn.execute("CREATE INDEX idx_daily_stats_day ON daily_stats (day)")
+    drivers = [d for d, in conn.execute("SELECT DISTINCT driver FROM events")]
+    for driver in drivers:
+        rows = conn.execute(f"SELECT ts, event FROM events WHERE driver = ? AND event IN ({', '.join('?' * len(STAT_EVENTS))}) "
+                            "ORDER BY ts, id", (driver, *STAT_EVENTS)).fetchall()
+        conn.executemany("INSERT INTO daily_stats (driver, day, trips, fatigue, drive_minutes) VALUES (?, ?, ?, ?, ?)",
+                         [(driver, day, *totals) for day, totals in _rollup(rows).items() if any(totals)])
+
+def _migrate_embedding_sources(conn):
+    # Content hash of the photo an embedding was computed from, so bulk
+    # enrollment can skip images it has already encoded.
+    conn.execute("ALTER TABLE embeddings ADD COLUMN source TEXT")
+    conn.execute("CREATE INDEX idx_embeddings_source ON embeddings (source)")
+
+def _migrate_event_clips(conn):
+    # Path of the video clip recorded around an alarm, if any.
+    conn.execute("ALTER TABLE events ADD COLUMN clip TEXT")
+
+# Each entry upgrades the schema by one version; PRAGMA user_version records
+# how many have been applied to a database file.
+MIGRATIONS = [
+    _migrate_embeddings_to_blobs,
+    _migrate_events_to_timestamps,
+    _migrate_daily_stats,
+    _migrate_embedding_sources,
+    _migrate_event_clips,
+]
+
+def migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        try:
+            conn.execute("BEGIN")
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"[DB] migrated schema to version {number}")
+
+def _refresh_day(conn, driver, day):
+    seed = conn.execute("SELECT ts, event FROM events WHERE driver = ? AND event IN (?, ?) AND ts < ? "
+                        "ORDER BY ts DESC, id DESC LIMIT 1", (driver, *TRIP_EVENTS, f"{day} 00:00:00")).fetchone()
+    rows = conn.execute(f"SELECT ts, event FROM events WHERE driver = ? AND event IN ({', '.join('?' * len(STAT_EVENTS))}) "
+                        "AND ts BETWEEN ? AND ? ORDER BY ts, id",
+                        (driver, *STAT_EVENTS, f"{day} 00:00:00", f"{day} 23:59:59")).fetchall()
+    totals = _rollup(rows, seed[0] if seed and seed[1] == "start_trip" else None).get(day, [0, 0, 0])
+    if any(totals):
+        conn.execute("INSERT OR REPLACE INTO daily_stats (driver, day, trips, fatigue, drive_minutes) "
+                     "VALUES (?, ?, ?, ?, ?)", (driver, day, *totals))
+    else:
+        conn.execute("DELETE FROM daily_stats WHERE driver = ? AND day = ?", (driver, day))
+
+def update_rollups(conn, changed):
+    # changed holds (driver, ts, event) of inserted, edited or deleted events.
+    # A trip event can also move the stop/start pairing of the driver's next
+    # day with trips, so that day is refreshed as well.
+    days = set()
+    for driver, ts, event in changed:
+        if event not in STAT_EVENTS:
+            continue
+        day = ts[:10]
+        days.add((driver, day))
+        if event in TRIP_EVENTS:
+            nxt = conn.execute("SELECT ts FROM events WHERE driver = ? AND event IN (?, ?) AND ts > ? "
+                               "ORDER BY ts, id LIMIT 1", (driver, *TRIP_EVENTS, f"{day} 23:59:59")).fetchone()
+            if nxt:
+                days.add((driver, nxt[0][:10]))
+    for driver, day in days:
+        _refresh_day(conn, driver, day)
+
+DB_WRITE_SECONDS = stage_timer("db_write")
+EVENTS_WRITTEN = counter("events_written", "Event rows committed by the background writer")
+
+class EventWriter:
+    def __init__(self, path=None, batch_size=64, flush_interval=0.5):
+        self.path = path or DB_PATH
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def put(self, row):
+        self._queue.put(("row", row))
+
+    def flush(self, timeout=5.0):
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def stop(self, timeout=5.0):
+        done = threading.Event()
+        self._queue.put(("stop", done))
+        done.wait(timeout)
+        self._thread.join(timeout)
+
+    def _run(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        pending = []
+        running = True
+        while running:
+            timeout = self.flush_interval if pending else None
+            try:
+                kind, item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                kind, item = "timeout", None
+            deadline = time.monotonic() + self.flush_interval
+            while kind == "row":
+                pending.append(item)
+                if len(pending) >= self.batch_size:
+                    break
+                try:
+                    kind, item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    kind, item = "timeout", None
+            if pending:
+                self._write(conn, pending)
+                pending = []
+            if kind in ("flush", "stop"):
+                item.set()
+                running = kind == "flush"
+        conn.close()
+
+    def _write(self, conn, rows):
+        try:
+            with DB_WRITE_SECONDS.time(), conn:
+                conn.executemany("INSERT INTO events (driver, event, ts, clip) VALUES (?, ?, ?, ?)", rows)
+                update_rollups(conn, [(driver, ts, event) for driver, event, ts, _ in rows])
+            EVENTS_WRITTEN.inc(len(rows))
+            self.written += len(rows)
+            self.batches += 1
+        except sqlite3.Error as e:
+            print(f"[ERROR] event writer: {e}")
+
+_writer = None
+
+def start_event_writer(**kwargs):
+    global _writer
+    if _writer is None:
+        _writer = EventWriter(**kwargs)
+        _writer.start()
+    return _writer
+
+def flush_events(timeout=5.0):
+    if _writer is not None:
+        _writer.flush(timeout)
+
+def stop_event_writer(timeout=5.0):
+    global _writer
+    if _writer is not None:
+        writer, _writer = _writer, None
+        writer.stop(timeout)
+
+atexit.register(stop_event_writer)
+
+def log_event(driver, event, clip=None):
+    row = (driver, event, datetime.now().strftime(TS_FORMAT), clip)
+    if _writer is not None:
+        _writer.put(row)
+        return
     conn = get_connection()
-    c = conn.cursor()
-    c.execute("INSERT INTO events (driver, event, date, time) VALUES (?, ?, ?, ?)",
-              (driver, event, now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S")))
-    conn.commit()
+    with conn:
+        conn.execute("INSERT INTO events (driver, event, ts, clip) VALUES (?, ?, ?, ?)", row)
+        update_rollups(conn, [(driver, row[2], event)])
     conn.close()
 
 def add_user(name, embedding, role="user"):
+    vectors = _embedding_rows(embedding)
     conn = get_connection()
-    c = conn.cursor()
-    c.execute("INSERT OR REPLACE INTO users (name, embedding, role) VALUES (?, ?, ?)",
-              (name, json.dumps(embedding), role))
-    conn.commit()
+    with conn:
+        conn.execute("INSERT INTO users (name, role) VALUES (?, ?) "
+                     "ON CONFLICT(name) DO UPDATE SET role=excluded.role", (name, role))
+        conn.execute("DELETE FROM embeddings WHERE name=?", (name,))
+        conn.executemany("INSERT INTO embeddings (name, vector) VALUES (?, ?)",
+                         [(name, v.tobytes()) for v in vectors])
     conn.close()
+    _notify_users("add", name, {"embeddings": list(vectors), "role": role})
+
+def get_embedding_sources():
+    conn = get_connection()
+    sources = {source for source, in conn.execute("SELECT source FROM embeddings WHERE source IS NOT NULL")}
+    conn.close()
+    return sources
+
+def enroll_users(users, role="user"):
+    # users maps name -> [(source_hash, embedding), ...]. Everything is
+    # written in one transaction; existing users keep their role and gain
+    # the new embeddings.
+    conn = get_connection()
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO users (name, role) VALUES (?, ?)", [(name, role) for name in users])
+        conn.executemany("INSERT INTO embeddings (name, vector, source) VALUES (?, ?, ?)",
+                         [(name, _embedding_rows(embedding)[0].tobytes(), source)
+                          for name, items in users.items() for source, embedding in items])
+    conn.close()
+    for name, items in users.items():
+        _notify_users("embedding", name, {"embeddings": [_embedding_rows(e)[0] for _, e in items]})
 
 def get_users():
     conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT name, embedding, role FROM users")
-    rows = c.fetchall()
+    users = {name: {"embeddings": [], "role": role}
+             for name, role in conn.execute("SELECT name, role FROM users")}
+    for name, vector in conn.execute("SELECT name, vector FROM embeddings ORDER BY id"):
+        if name in users:
+            users[name]["embeddings"].append(_from_blob(vector))
     conn.close()
-    return {name: {"embedding": json.loads(embedding), "role": role} for name, embedding, role in rows}
+    for data in users.values():
+        data["embedding"] = data["embeddings"][0] if data["embeddings"] else None
+    return users
 
 def get_user(name):
     conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT embedding, role FROM users WHERE name=?", (name,))
-    row = c.fetchone()
+    row = conn.execute("SELECT role FROM users WHERE name=?", (name,)).fetchone()
+    vectors = [_from_blob(v) for v, in conn.execute("SELECT vector FROM embeddings WHERE name=? ORDER BY id", (name,))]
     conn.close()
     if row:
-        return {"embedding": json.loads(row[0]), "role": row[1]}
+        return {"embedding": vectors[0] if vectors else None, "embeddings": vectors, "role": row[0]}
     return None
 
-def get_events():
+def _ts(value, end=False):
+    if isinstance(value, datetime):
+        return value.strftime(TS_FORMAT)
+    if len(value) == 10:
+        return f"{value} {'23:59:59' if end else '00:00:00'}"
+    return value
+
+def _event_clause(event):
+    # event is a name or a list of names; names ending in "%" match as a
+    # prefix. A prefix is written as a range rather than LIKE so SQLite can
+    # still seek on the (event, ts) index with its default case-insensitive LIKE.
+    patterns = [event] if isinstance(event, str) else list(event)
+    exact = [p for p in patterns if not p.endswith("%")]
+    parts, values = [], []
+    if exact:
+        parts.append(f"event IN ({', '.join('?' * len(exact))})")
+        values.extend(exact)
+    for p in patterns:
+        if p.endswith("%"):
+            parts.append("(event >= ? AND event < ?)")
+            values.extend([p[:-1], p[:-1] + "\uffff"])
+    return "(" + " OR ".join(parts) + ")", values
+
+def get_event_clip(event_id):
     conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT id, driver, date, time, event FROM events")
-    rows = c.fetchall()
+    row = conn.execute("SELECT clip FROM events WHERE id=?", (event_id,)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def get_events(driver=None, event=None, since=None, until=None, after_id=None, limit=None):
+    # Rows come back as (id, driver, date, time, event) ordered by (ts, id);
+    # event may also be a list or a "prefix%" pattern, see _event_clause.
+    # pass the id of the last row seen as after_id to fetch the next page.
+    clauses, params = [], []
+    if driver is not None:
+        clauses.append("driver = ?")
+        params.append(driver)
+    if event is not None:
+        clause, values = _event_clause(event)
+        clauses.append(clause)
+        params.extend(values)
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(_ts(since))
+    if until is not None:
+        clauses.append("ts <= ?")
+        params.append(_ts(until, end=True))
+    if after_id is not None:
+        clauses.append("(ts, id) > ((SELECT ts FROM events WHERE id = ?), ?)")
+        params.extend([after_id, after_id])
+    sql = "SELECT id, driver, substr(ts, 1, 10), substr(ts, 12), event FROM events"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY ts, id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    conn = get_connection()
+    rows = conn.execute(sql, params).fetchall()
     conn.close()
     return rows
 
+def _event_key(conn, event_id):
+    return conn.execute("SELECT driver, ts, event FROM events WHERE id=?", (event_id,)).fetchone()
+
 def update_event(event_id, driver, date, time, event):
+    row = (driver, f"{date} {time}", event)
     conn = get_connection()
-    c = conn.cursor()
-    c.execute("UPDATE events SET driver=?, date=?, time=?, event=? WHERE id=?",
-              (driver, date, time, event, event_id))
-    conn.commit()
+    with conn:
+        old = _event_key(conn, event_id)
+        conn.execute("UPDATE events SET driver=?, ts=?, event=? WHERE id=?", (*row, event_id))
+        update_rollups(conn, [row] + ([old] if old else []))
     conn.close()
 
 def delete_event(event_id):
     conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM events WHERE id=?", (event_id,))
-    conn.commit()
+    with conn:
+        old = _event_key(conn, event_id)
+        conn.execute("DELETE FROM events WHERE id=?", (event_id,))
+        if old:
+            update_rollups(conn, [old])
     conn.close()
 
 def add_event(driver, date, time, event):
+    row = (driver, f"{date} {time}", event)
     conn = get_connection()
-    c = conn.cursor()
-    c.execute("INSERT INTO events (driver, date, time, event) VALUES (?, ?, ?, ?)",
-              (driver, date, time, event))
-    conn.commit()
+    with conn:
+        conn.execute("INSERT INTO events (driver, ts, event) VALUES (?, ?, ?)", row)
+        update_rollups(conn, [row])
+    conn.close()
+
+def get_stats(driver=None, since=None, until=None):
+    clauses, params = [], []
+    if driver is not None:
+        clauses.append("driver = ?")
+        params.append(driver)
+    if since is not None:
+        clauses.append("day >= ?")
+        params.append(_ts(since)[:10])
+    if until is not None:
+        clauses.append("day <= ?")
+        params.append(_ts(until, end=True)[:10])
+    sql = "SELECT driver, SUM(trips), SUM(fatigue), SUM(drive_minutes) FROM daily_stats"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " GROUP BY driver ORDER BY driver"
+    conn = get_connection()
+    rows = conn.execute(sql, params).fetchall()
     conn.close()
+    return {d: {"trips": trips, "fatigue": fatigue, "duration": minutes} for d, trips, fatigue, minutes in rows}
 
 def update_user_role(name, new_role):
     conn = get_connection()
@@ -101,3 +462,4 @@ def update_user_role(name, new_role):
     c.execute("UPDATE users SET role=? WHERE name=?", (new_role, name))
     conn.commit()
     conn.close()
+    _notify_users("role", name, {"role": new_role})
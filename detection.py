@@ -0,0 +1,82 @@
+from collections import namedtuple
+from contextlib import nullcontext
+import cv2
+import numpy as np
+from fatigue import DRIVE
+
+AWAKE_COLOR = (255, 0, 0)
+DROWSY_COLOR = (0, 0, 255)
+
+Detections = namedtuple("Detections", ["cls", "conf", "xyxy", "drowsy", "awake"])
+
+
+def class_ids(names):
+    ids = {label: cls_id for cls_id, label in names.items()}
+    return ids.get("awake", -1), ids.get("drowsy", -1)
+
+
+def empty_detections():
+    return Detections(np.empty(0, np.int32), np.empty(0, np.float32), np.empty((0, 4), np.int32), 0, 0)
+
+
+def detections_from_arrays(data, sizes, names):
+    # data is one (N, 6+) array of [x1, y1, x2, y2, ..., conf, cls] rows for
+    # every frame of the batch, sizes the number of rows belonging to each frame.
+    awake_id, drowsy_id = class_ids(names)
+    n_frames = len(sizes)
+    frame_idx = np.repeat(np.arange(n_frames), sizes)
+    cls = data[:, -1].astype(np.int32)
+    is_drowsy = cls == drowsy_id
+    is_awake = cls == awake_id
+
+    drowsy_counts = np.bincount(frame_idx[is_drowsy], minlength=n_frames)
+    keep = ~(is_awake & (drowsy_counts > 0)[frame_idx])
+    awake_counts = np.bincount(frame_idx[is_awake & keep], minlength=n_frames)
+
+    conf = data[:, -2].astype(np.float32)
+    xyxy = data[:, :4].astype(np.int32)
+    bounds = np.concatenate(([0], np.cumsum(sizes)))
+    out = []
+    for i in range(n_frames):
+        sl = slice(bounds[i], bounds[i + 1])
+        k = keep[sl]
+        out.append(Detections(cls[sl][k], conf[sl][k], xyxy[sl][k], int(drowsy_counts[i]), int(awake_counts[i])))
+    return out
+
+
+def extract_detections(results, names):
+    data = [r.boxes.data.cpu().numpy() for r in results]
+    sizes = [len(d) for d in data]
+    if sum(sizes):
+        stacked = np.concatenate([d for d in data if len(d)])
+    else:
+        stacked = np.empty((0, 6), np.float32)
+    return detections_from_arrays(stacked, sizes, names)
+
+
+def draw_detections(frame, det, names):
+    awake_id, _ = class_ids(names)
+    for cls_id, conf, (x1, y1, x2, y2) in zip(det.cls.tolist(), det.conf.tolist(), det.xyxy.tolist()):
+        label = names[cls_id]
+        color = AWAKE_COLOR if cls_id == awake_id else DROWSY_COLOR
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, f"{label.upper()} {conf:.2f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+
+
+def draw_fatigue_bar(frame, fatigue):
+    filled_w = int(fatigue.ratio * frame.shape[1])
+    cv2.rectangle(frame, (0, 0), (frame.shape[1], 25), (230, 230, 230), -1)
+    cv2.rectangle(frame, (0, 0), (filled_w, 25), (0, 0, 255), -1)
+    if fatigue.alarm_on:
+        cv2.putText(frame, "DROWSY ALERT!", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
+
+
+def analyze_frame(frame, model, scheduler, fatigue, ts, lock=None):
+    # One step shared by the GUI, replay and headless runs: scheduled
+    # detection while driving, then the fatigue engine at time `ts`. The
+    # model runs outside `lock` so break buttons never wait on inference;
+    # the engine ignores `det` if a break started meanwhile.
+    det = scheduler.run(frame, fatigue.ratio, lambda f: model.predict([f])[0]) if fatigue.mode == DRIVE else None
+    with lock if lock is not None else nullcontext():
+        events = fatigue.update(ts, det)
+    return det, events
@@ -0,0 +1,107 @@
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from db import init_db, enroll_users, get_embedding_sources
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def scan(directory):
+    # <directory>/<driver name>/<photo>; yields (driver, path) pairs.
+    for driver in sorted(os.listdir(directory)):
+        folder = os.path.join(directory, driver)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield driver, os.path.join(folder, name)
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def encode_image(path, max_side=1280, scale=0.5):
+    # Runs in a worker process; returns (embedding or None, seconds spent).
+    from face_index import get_embedding
+    t0 = time.perf_counter()
+    image = cv2.imread(path)
+    if image is None:
+        return None, time.perf_counter() - t0
+    # Phone photos are far larger than the face needs.
+    longest = max(image.shape[:2])
+    if longest > max_side:
+        image = cv2.resize(image, None, fx=max_side / longest, fy=max_side / longest, interpolation=cv2.INTER_AREA)
+    embedding = get_embedding(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), scale=scale)
+    return embedding, time.perf_counter() - t0
+
+
+def enroll(directory, workers=None, role="user", dry_run=False):
+    t0 = time.perf_counter()
+    known = get_embedding_sources()
+    jobs = []
+    skipped = 0
+    for driver, path in scan(directory):
+        source = file_hash(path)
+        if source in known:
+            skipped += 1
+            continue
+        # the same photo twice in one run is encoded once
+        known.add(source)
+        jobs.append((driver, path, source))
+
+    users = {}
+    failed = []
+    encode_time = 0.0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(encode_image, [path for _, path, _ in jobs], chunksize=4)
+            for (driver, path, source), (embedding, seconds) in zip(jobs, results):
+                encode_time += seconds
+                if embedding is None:
+                    failed.append(path)
+                else:
+                    users.setdefault(driver, []).append((source, embedding))
+
+    if users and not dry_run:
+        enroll_users(users, role=role)
+    wall = time.perf_counter() - t0
+    return {
+        "drivers": len(users),
+        "encoded": sum(len(v) for v in users.values()),
+        "skipped": skipped,
+        "no_face": failed,
+        "images": len(jobs),
+        "wall_s": wall,
+        "images_per_s": len(jobs) / wall if wall else 0.0,
+        "ms_per_image": 1000 * encode_time / len(jobs) if jobs else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll drivers from a directory of photos, one sub-directory per driver")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=None, help="encoding processes (default: one per CPU)")
+    parser.add_argument("--role", type=str, default="user", help="role given to drivers that do not exist yet")
+    parser.add_argument("--dry-run", action="store_true", help="encode but do not write to the database")
+    opt = parser.parse_args()
+
+    init_db()
+    report = enroll(opt.directory, workers=opt.workers, role=opt.role, dry_run=opt.dry_run)
+    for path in report["no_face"]:
+        print(f"[enroll] no face found in {path}")
+    print(f"[enroll] {report['encoded']} embeddings for {report['drivers']} drivers, "
+          f"{report['skipped']} already enrolled, {len(report['no_face'])} without a face")
+    print(f"[enroll] {report['images']} images in {report['wall_s']:.1f} s "
+          f"({report['images_per_s']:.1f} images/s, {report['ms_per_image']:.0f} ms per image per worker)")
+
+
+if __name__ == "__main__":
+    main()
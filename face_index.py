@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+from db import get_users, add_user_listener
+
+
+def get_embedding(image, scale=0.5):
+    import face_recognition
+    # HOG face location on a downscaled frame, then the encoding of the
+    # largest face at full resolution.
+    small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    face_locations = face_recognition.face_locations(small)
+    if face_locations:
+        top, right, bottom, left = max(face_locations, key=lambda b: (b[2] - b[0]) * (b[1] - b[3]))
+        box = (int(top / scale), int(right / scale), int(bottom / scale), int(left / scale))
+        return face_recognition.face_encodings(image, known_face_locations=[box])[0].tolist()
+    return None
+
+
+class FaceIndex:
+    def __init__(self, dim=128, capacity=64):
+        self.dim = dim
+        self.labels = []
+        self.roles = {}
+        self._rows = {}
+        self._matrix = np.empty((capacity, dim), np.float32)
+        self._sq_norms = np.empty(capacity, np.float32)
+
+    @classmethod
+    def from_db(cls):
+        index = cls()
+        for name, data in get_users().items():
+            index.add(name, data["embeddings"], data["role"])
+        add_user_listener(index.on_user_change)
+        return index
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _grow(self):
+        n = len(self.labels)
+        capacity = self._matrix.shape[0] * 2
+        matrix = np.empty((capacity, self.dim), np.float32)
+        matrix[:n] = self._matrix[:n]
+        sq_norms = np.empty(capacity, np.float32)
+        sq_norms[:n] = self._sq_norms[:n]
+        self._matrix, self._sq_norms = matrix, sq_norms
+
+    def _append_row(self, name, vector):
+        if len(self.labels) == self._matrix.shape[0]:
+            self._grow()
+        row = len(self.labels)
+        self._matrix[row] = vector
+        self._sq_norms[row] = vector @ vector
+        self.labels.append(name)
+        self._rows.setdefault(name, []).append(row)
+
+    def _remove_row(self, row):
+        last = len(self.labels) - 1
+        moved = self.labels[last]
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self._sq_norms[row] = self._sq_norms[last]
+            self.labels[row] = moved
+            rows = self._rows[moved]
+            rows[rows.index(last)] = row
+        self.labels.pop()
+
+    def remove(self, name):
+        # Highest rows first so swapping the last row in never moves one of ours.
+        for row in sorted(self._rows.get(name, []), reverse=True):
+            self._remove_row(row)
+            self._rows[name].remove(row)
+        self._rows.pop(name, None)
+        self.roles.pop(name, None)
+
+    def add(self, name, embeddings, role="user"):
+        self.remove(name)
+        self.add_embeddings(name, embeddings)
+        self.roles[name] = role
+
+    def add_embeddings(self, name, embeddings):
+        self.roles.setdefault(name, "user")
+        for vector in np.asarray(embeddings, np.float32).reshape(-1, self.dim):
+            self._append_row(name, vector)
+
+    def set_role(self, name, role):
+        if name in self.roles:
+            self.roles[name] = role
+
+    def on_user_change(self, action, name, data):
+        if action == "add":
+            self.add(name, data["embeddings"], data["role"])
+        elif action == "embedding":
+            self.add_embeddings(name, data["embeddings"])
+        elif action == "role":
+            self.set_role(name, data["role"])
+
+    def distances(self, embedding):
+        n = len(self.labels)
+        query = np.asarray(embedding, np.float32)
+        # |a - b|^2 = |a|^2 - 2ab + |b|^2, one matrix-vector product for the whole roster
+        sq = self._sq_norms[:n] - 2.0 * (self._matrix[:n] @ query) + query @ query
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    def nearest(self, embedding):
+        if not self.labels:
+            return None, float("inf")
+        dists = self.distances(embedding)
+        i = int(np.argmin(dists))
+        return self.labels[i], float(dists[i])
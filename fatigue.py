@@ -0,0 +1,157 @@
+import time
+
+DRIVE = "drive"
+SHORT_BREAK = "short_break"
+LONG_BREAK = "long_break"
+
+# Events are bit flags so update() can report any combination without
+# building a list on every frame.
+ALARM_ON = 1
+ALARM_OFF = 2
+FATIGUE_DETECTED = 4
+DRIVE_OVERTIME = 8
+SHORT_BREAK_EXCEEDED = 16
+START_LONG_BREAK = 32
+EARLY_LONG_BREAK_STOPPED = 64
+STOP_LONG_BREAK = 128
+LONG_BREAK_EXCEEDED = 256
+
+EVENT_NAMES = {
+    ALARM_ON: "alarm_on",
+    ALARM_OFF: "alarm_off",
+    FATIGUE_DETECTED: "fatigue_detected",
+    DRIVE_OVERTIME: "drive_overtime",
+    SHORT_BREAK_EXCEEDED: "short_break_exceeded",
+    START_LONG_BREAK: "start_long_break",
+    EARLY_LONG_BREAK_STOPPED: "early_long_break_stopped",
+    STOP_LONG_BREAK: "stop_long_break",
+    LONG_BREAK_EXCEEDED: "long_break_exceeded",
+}
+
+# Everything except the alarm transitions is written to the events table.
+LOGGED_EVENTS = ~(ALARM_ON | ALARM_OFF)
+
+
+def event_names(events):
+    return [name for flag, name in EVENT_NAMES.items() if events & flag]
+
+
+class FatigueEngine:
+    __slots__ = (
+        "fatigue_max", "alarm_ratio", "reset_ratio", "rise_rate", "decay_rate", "max_step",
+        "drive_limit", "short_break_limit", "long_break_limit", "long_break_min",
+        "level", "alarm_on", "logged", "mode", "drive_start", "pause_start", "last_ts",
+        "overtime_logged", "short_break_logged", "long_break_logged",
+    )
+
+    def __init__(self, ts=None, fatigue_max=100.0, alarm_ratio=0.75, reset_ratio=0.5,
+                 rise_rate=20.0, decay_rate=20.0, max_step=3.0,
+                 drive_limit=240.0, short_break_limit=10.0, long_break_limit=60.0, long_break_min=45.0):
+        ts = time.monotonic() if ts is None else ts
+        self.fatigue_max = fatigue_max
+        self.alarm_ratio = alarm_ratio
+        self.reset_ratio = reset_ratio
+        # Level change per second for each drowsy / awake box, so the alarm
+        # takes the same wall time to build up at 5 fps as at 30 fps.
+        self.rise_rate = rise_rate
+        self.decay_rate = decay_rate
+        # Longer gaps between updates are stalls (a frozen camera, a paused
+        # debugger) rather than slow frames; CPU-only units can still process
+        # as few as 1 frame/s, which must build up at the same rate.
+        self.max_step = max_step
+        self.drive_limit = drive_limit
+        self.short_break_limit = short_break_limit
+        self.long_break_limit = long_break_limit
+        self.long_break_min = long_break_min
+        self.level = 0.0
+        self.alarm_on = False
+        self.logged = False
+        self.mode = DRIVE
+        self.drive_start = ts
+        self.pause_start = None
+        self.last_ts = ts
+        self.overtime_logged = False
+        self.short_break_logged = False
+        self.long_break_logged = False
+
+    @property
+    def ratio(self):
+        return self.level / self.fatigue_max
+
+    def elapsed(self, ts):
+        return ts - (self.drive_start if self.mode == DRIVE else self.pause_start)
+
+    def update(self, ts, det=None):
+        dt = min(max(ts - self.last_ts, 0.0), self.max_step)
+        self.last_ts = ts
+        events = 0
+
+        if self.mode == SHORT_BREAK:
+            if ts - self.pause_start > self.short_break_limit and not self.short_break_logged:
+                self.short_break_logged = True
+                events |= SHORT_BREAK_EXCEEDED
+            return events
+
+        if self.mode == LONG_BREAK:
+            if ts - self.pause_start > self.long_break_limit and not self.long_break_logged:
+                self.long_break_logged = True
+                events |= LONG_BREAK_EXCEEDED
+            return events
+
+        if ts - self.drive_start > self.drive_limit and not self.overtime_logged:
+            self.overtime_logged = True
+            events |= DRIVE_OVERTIME
+
+        if det is not None:
+            # After the awake/drowsy conflict rule only one count is non-zero.
+            delta = (det.drowsy * self.rise_rate - det.awake * self.decay_rate) * dt
+            self.level = max(0.0, min(self.fatigue_max, self.level + delta))
+
+        if self.ratio > self.alarm_ratio:
+            if not self.alarm_on:
+                self.alarm_on = True
+                events |= ALARM_ON
+            if not self.logged:
+                self.logged = True
+                events |= FATIGUE_DETECTED
+        else:
+            if self.alarm_on:
+                self.alarm_on = False
+                events |= ALARM_OFF
+            if self.level < self.reset_ratio * self.fatigue_max:
+                self.logged = False
+        return events
+
+    def _pause(self, ts, mode):
+        self.mode = mode
+        self.pause_start = ts
+        if self.alarm_on:
+            self.alarm_on = False
+            return ALARM_OFF
+        return 0
+
+    def _resume(self, ts):
+        self.mode = DRIVE
+        self.last_ts = ts
+
+    def toggle_short_break(self, ts):
+        if self.mode == DRIVE:
+            return self._pause(ts, SHORT_BREAK)
+        if self.mode == SHORT_BREAK:
+            self._resume(ts)
+            self.short_break_logged = False
+        return 0
+
+    def toggle_long_break(self, ts):
+        if self.mode == DRIVE:
+            return self._pause(ts, LONG_BREAK) | START_LONG_BREAK
+        if self.mode == LONG_BREAK:
+            events = STOP_LONG_BREAK
+            if ts - self.pause_start < self.long_break_min:
+                events |= EARLY_LONG_BREAK_STOPPED
+            self._resume(ts)
+            self.long_break_logged = False
+            self.drive_start = ts
+            self.overtime_logged = False
+            return events
+        return 0
@@ -0,0 +1,131 @@
+import json
+import time
+from collections import deque
+import numpy as np
+from metrics import counter, gauge
+
+IMGSZ_STEPS = (640, 512, 416, 320)
+RESOLUTION_STEPS = ((1920, 1080), (1280, 720), (960, 540), (640, 480), (480, 360), (320, 240))
+
+ADJUSTMENTS = counter("governor_adjustments", "Quality level changes made by the latency governor")
+
+
+def build_levels(interval, imgsz, resolution, max_interval_step=3):
+    # Level 0 is the configured quality; every further level is one step
+    # cheaper: smaller model input first (the biggest cost on CPU), then
+    # fewer inferences, then a smaller capture resolution.
+    level = {"imgsz": imgsz, "interval": interval, "resolution": resolution}
+    levels = [dict(level)]
+    if imgsz:
+        for size in IMGSZ_STEPS:
+            if size < imgsz:
+                level["imgsz"] = size
+                levels.append(dict(level))
+    for step in range(1, max_interval_step + 1):
+        level["interval"] = interval + step
+        levels.append(dict(level))
+    if resolution:
+        for res in RESOLUTION_STEPS:
+            if res[0] < resolution[0]:
+                level["resolution"] = res
+                levels.append(dict(level))
+    return levels
+
+
+class LatencyGovernor:
+    # Feedback loop on the rolling mean per-frame latency (the mean, not a
+    # tail percentile, so skipping inferences shows up as relief): above the
+    # budget it steps one level cheaper, and after `hold` calm evaluations under
+    # `recover_ratio` of the budget it steps one level back up. The ladder is
+    # built from the configured `imgsz` and `resolution`, not from the current
+    # state of the backend and camera, which outlive a trip.
+    def __init__(self, budget_ms, scheduler, backend, camera=None, level=0, imgsz=None, resolution=None,
+                 window=60, period=2.0, recover_ratio=0.6, hold=3, log_path=None):
+        self.budget = budget_ms / 1000.0
+        self.scheduler = scheduler
+        self.backend = backend
+        self.camera = camera
+        self.levels = build_levels(scheduler.interval, imgsz, resolution if camera is not None else None)
+        self.level = 0
+        self.period = period
+        self.recover_ratio = recover_ratio
+        self.hold = hold
+        self.log_path = log_path
+        self.samples = deque(maxlen=window)
+        self.history = []
+        self._calm = 0
+        self._last_eval = None
+        gauge("governor_level", "Current quality level, 0 = configured").set_function(lambda: self.level)
+        if level:
+            self._set_level(min(level, len(self.levels) - 1), "resumed")
+
+    def observe(self, seconds, now=None):
+        self.samples.append(seconds)
+        now = time.monotonic() if now is None else now
+        if self._last_eval is None:
+            self._last_eval = now
+        if now - self._last_eval < self.period or len(self.samples) < self.samples.maxlen // 4:
+            return
+        self._last_eval = now
+        mean = float(np.mean(self.samples))
+        if mean > self.budget and self.level < len(self.levels) - 1:
+            self._calm = 0
+            self._set_level(self.level + 1, f"mean {mean * 1000:.0f} ms > {self.budget * 1000:.0f} ms budget")
+        elif mean < self.recover_ratio * self.budget and self.level > 0:
+            self._calm += 1
+            if self._calm >= self.hold:
+                self._calm = 0
+                self._set_level(self.level - 1, f"mean {mean * 1000:.0f} ms < {self.recover_ratio * self.budget * 1000:.0f} ms")
+        else:
+            self._calm = 0
+
+    def _apply(self, settings):
+        self.scheduler.interval = settings["interval"]
+        if settings["imgsz"]:
+            self.backend.imgsz = settings["imgsz"]
+        if settings["resolution"] and self.camera is not None:
+            self.camera.set_resolution(*settings["resolution"])
+
+    def restore(self):
+        # Puts the shared backend and camera back to the configured quality,
+        # e.g. for the login preview after a degraded trip; `level` is kept.
+        self._apply(self.levels[0])
+
+    def _set_level(self, level, reason):
+        old, self.level = self.level, level
+        settings = self.levels[level]
+        self._apply(settings)
+        # The new settings get a clean window to be judged on.
+        self.samples.clear()
+        ADJUSTMENTS.inc()
+        res = "x".join(map(str, settings["resolution"])) if settings["resolution"] else "-"
+        print(f"[governor] {reason}: level {old} -> {level} "
+              f"(imgsz {settings['imgsz'] or '-'}, interval {settings['interval']}, capture {res})", flush=True)
+        entry = {"ts": time.time(), "reason": reason, "from": old, "to": level,
+                 "imgsz": settings["imgsz"], "interval": settings["interval"], "resolution": settings["resolution"]}
+        self.history.append(entry)
+        if self.log_path:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+def make_governor(opt, scheduler, backend, camera=None, level=0):
+    if not opt.budget_ms:
+        return None
+    if getattr(backend, "imgsz", None) is None:
+        imgsz = None  # the stub backend has no input size
+    elif hasattr(backend, "roi"):
+        imgsz = opt.roi_imgsz
+    else:
+        imgsz = opt.imgsz
+    resolution = None
+    if camera is not None:
+        resolution = (opt.width, opt.height) if opt.width and opt.height else camera.resolution
+    return LatencyGovernor(opt.budget_ms, scheduler, backend, camera, level=level, imgsz=imgsz,
+                           resolution=resolution, log_path=opt.governor_log)
+
+
+def add_governor_args(parser):
+    parser.add_argument("--budget-ms", type=float, default=0.0,
+                        help="per-frame latency budget; lowers input size, inference rate and resolution to meet it (0 = off)")
+    parser.add_argument("--governor-log", type=str, default=None, help="append every governor adjustment to this JSON-lines file")
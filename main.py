@@ -1,13 +1,15 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import tkinter as tk
 from tkinter import simpledialog
-from PIL import Image, ImageTk
-import subprocess
-import threading
-import time
-import face_recognition
-import numpy as np
-from db import init_db, get_users, get_user, add_user
+from db import add_user
+from face_index import get_embedding
+from render import Renderer
+
+LOGIN_FRAMES = 5
+LOGIN_TIMEOUT = 3.0
 
 def show_temp_popup(message, duration=2500, bg="#007acc", fg="white"):
     popup = tk.Toplevel()
@@ -25,133 +27,163 @@ def show_temp_popup(message, duration=2500, bg="#007acc", fg="white"):
     popup.geometry(f"{width}x{height}+{x}+{y}")
     popup.after(duration, popup.destroy)
 
-def prompt_new_username():
-    popup = tk.Tk()
-    popup.withdraw()
-    name = simpledialog.askstring("New User", "Enter your name:")
-    popup.destroy()
-    return name
-
-def get_embedding(image):
-    face_locations = face_recognition.face_locations(image)
-    if face_locations:
-        return face_recognition.face_encodings(image, known_face_locations=face_locations)[0].tolist()
-    return None
-
-def recognize_person(embedding, database, tolerance=0.5):
-    for name, data in database.items():
-        match = face_recognition.compare_faces([np.array(data["embedding"])], np.array(embedding), tolerance=tolerance)
-        if match[0]:
+def prompt_new_username(parent=None):
+    return simpledialog.askstring("New User", "Enter your name:", parent=parent)
+
+def collect_embeddings(camera, count=LOGIN_FRAMES, timeout=LOGIN_TIMEOUT):
+    embeddings = []
+    deadline = time.monotonic() + timeout
+    while len(embeddings) < count and time.monotonic() < deadline:
+        ret, frame = camera.read()
+        if not ret:
+            continue
+        embedding = get_embedding(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if embedding:
+            embeddings.append(embedding)
+    return embeddings
+
+def recognize_person(embeddings, index, tolerance=0.5):
+    # Every frame votes for its nearest driver within tolerance; a name
+    # needs a majority of the frames, so one bad frame cannot log in as
+    # somebody else.
+    votes = Counter()
+    for embedding in embeddings:
+        name, distance = index.nearest(embedding)
+        if distance <= tolerance:
+            votes[name] += 1
+    if votes:
+        name, count = votes.most_common(1)[0]
+        if count * 2 > len(embeddings):
+            print(f"Closest match: {name} ({count}/{len(embeddings)} frames)")
             return name
     return None
 
-def is_admin(name):
-    user = get_user(name)
-    return user and user.get("role") == "admin"
-
-def capture_and_process(frame):
-    db = get_users()
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    embedding = get_embedding(rgb_frame)
-    if embedding:
-        person = recognize_person(embedding, db)
-        if person:
-            print(f"Recognized person: {person}", flush=True)
-            return person, True
-        else:
-            name = prompt_new_username()
-            if name:
-                add_user(name, embedding)
-                print(f"New user added: {name}")
-                return name, True
-            else:
-                print("User cancelled name entry.")
-                return "unknown", False
-    print("No face detected.")
+def is_admin(name, index):
+    return index.roles.get(name) == "admin"
+
+def identify(app):
+    # Runs on the login worker thread, off the Tk loop.
+    index = app.face_index()
+    embeddings = collect_embeddings(app.camera())
+    return recognize_person(embeddings, index), embeddings
+
+def confirm_person(person, embeddings, parent=None):
+    if person:
+        print(f"Recognized person: {person}", flush=True)
+        return person, True
+    if not embeddings:
+        print("No face detected.")
+        return "unknown", False
+    name = prompt_new_username(parent)
+    if name:
+        add_user(name, embeddings)
+        print(f"New user added: {name}")
+        return name, True
+    print("User cancelled name entry.")
     return "unknown", False
 
-def start_detection_after_delay(person_name):
-    time.sleep(1.2)
-    subprocess.run(["python", "drowsiness_detection.py", "--user", person_name])
-
-def on_start_click(root, cap):
-    ret, frame = cap.read()
-    if ret:
-        person_name, success = capture_and_process(frame)
-        if person_name == "unknown" or not success:
-            show_temp_popup("Face not detected or user not confirmed.\nPlease try again.", bg="#f39c12")
-            return
-        cap.release()
-        root.quit()
-        root.destroy()
-        threading.Thread(target=start_detection_after_delay, args=(person_name,)).start()
-
-def on_admin_click(root, cap):
-    ret, frame = cap.read()
-    if ret:
-        person_name, success = capture_and_process(frame)
-        if success and is_admin(person_name):
-            cap.release()
-            root.quit()
-            root.destroy()
-            subprocess.run(["python", "admin_panel.py", "--user", person_name])
-        else:
-            show_temp_popup("You do not have administrator privileges.", bg="#d9534f")
-
-def center_window(window, width=960, height=640):
-    screen_w = window.winfo_screenwidth()
-    screen_h = window.winfo_screenheight()
-    x = int((screen_w - width) / 2)
-    y = int((screen_h - height) / 2)
-    window.geometry(f"{width}x{height}+{x}+{y}")
-
-def show_start_gui():
-    init_db()
-    root = tk.Tk()
+def on_start_result(app, person, embeddings):
+    person_name, success = confirm_person(person, embeddings, app.root)
+    if person_name == "unknown" or not success:
+        show_temp_popup("Face not detected or user not confirmed.\nPlease try again.", bg="#f39c12")
+        return
+    app.show_drive(person_name)
+
+def on_admin_result(app, person, embeddings):
+    person_name, success = confirm_person(person, embeddings, app.root)
+    if success and is_admin(person_name, app.face_index()):
+        app.show_admin(person_name)
+    else:
+        show_temp_popup("You do not have administrator privileges.", bg="#d9534f")
+
+def build_login_view(app):
+    root = app.root
     root.title("Driver Drowsiness Detection")
-    center_window(root)
-    root.configure(bg="#1e1e2f")
+    app.center(960, 640)
+    view = tk.Frame(root, bg="#1e1e2f")
 
-    video_frame = tk.Label(root, bg="#2c2f3a", bd=2, relief="ridge", highlightbackground="#444", highlightthickness=1)
+    video_frame = tk.Label(view, bg="#2c2f3a", bd=2, relief="ridge", highlightbackground="#444", highlightthickness=1)
     video_frame.pack(pady=20)
 
-    cap = cv2.VideoCapture(0)
+    status_label = tk.Label(view, text="", font=("Segoe UI", 11), bg="#1e1e2f", fg="#e0e0e0")
+    status_label.pack()
+
+    frame_job = None
+    login_job = None
+    login_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="login")
+    renderer = Renderer(video_frame, max_size=(640, 480), max_fps=app.opt.display_fps)
 
     def update_frame():
-        ret, frame = cap.read()
-        if ret:
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(rgb_frame)
-            imgtk = ImageTk.PhotoImage(image=img)
-            video_frame.imgtk = imgtk
-            video_frame.configure(image=imgtk)
-        root.after(20, update_frame)
-
-    def on_close():
-        cap.release()
-        root.quit()
-        root.destroy()
-
-    root.protocol("WM_DELETE_WINDOW", on_close)
+        nonlocal frame_job
+        # The preview only reads the frame, so it can use the camera's
+        # ring buffer directly instead of a copy.
+        _, _, frame = app.camera().latest() if app.camera_ready() else (-1, 0.0, None)
+        if frame is not None:
+            renderer.show(frame)
+        frame_job = view.after(renderer.next_delay(20), update_frame)
+
+    def set_busy(busy):
+        state = "disabled" if busy else "normal"
+        start_btn.config(state=state)
+        admin_btn.config(state=state)
+        status_label.config(text="Looking for your face..." if busy else "")
+
+    def start_login(on_result):
+        # Recognition runs on the worker while the preview keeps going; the
+        # result is picked up here on the Tk thread.
+        nonlocal login_job
+        set_busy(True)
+        future = login_worker.submit(identify, app)
+
+        def poll():
+            nonlocal login_job
+            if not future.done():
+                login_job = view.after(50, poll)
+                return
+            login_job = None
+            set_busy(False)
+            try:
+                person, embeddings = future.result()
+            except Exception as e:
+                print(f"[ERROR] login: {e}")
+                show_temp_popup("Face recognition failed.\nPlease try again.", bg="#d9534f")
+                return
+            on_result(app, person, embeddings)
+
+        login_job = view.after(50, poll)
+
+    def close():
+        if frame_job is not None:
+            view.after_cancel(frame_job)
+        if login_job is not None:
+            view.after_cancel(login_job)
+        login_worker.shutdown(wait=False, cancel_futures=True)
+
     update_frame()
 
-    button_frame = tk.Frame(root, bg="#1e1e2f")
+    button_frame = tk.Frame(view, bg="#1e1e2f")
     button_frame.pack(pady=10)
 
     btn_style = {"font": ("Segoe UI", 14),"width": 18,"bg": "#3498db","fg": "white","activebackground": "#2980b9","bd": 0,"height": 2}
     
     exit_btn_style = {"font": ("Segoe UI", 14),"width": 18,"bg": "#d9534f","fg": "white","activebackground": "#c9302c","bd": 0,"height": 2}
 
-    start_btn = tk.Button(button_frame, text="Start Trip", command=lambda: on_start_click(root, cap), **btn_style)
+    start_btn = tk.Button(button_frame, text="Start Trip", command=lambda: start_login(on_start_result), **btn_style)
     start_btn.grid(row=0, column=0, padx=15)
 
-    admin_btn = tk.Button(button_frame, text="Admin Panel", command=lambda: on_admin_click(root, cap), **btn_style)
+    admin_btn = tk.Button(button_frame, text="Admin Panel", command=lambda: start_login(on_admin_result), **btn_style)
     admin_btn.grid(row=0, column=1, padx=15)
     
-    exit_btn = tk.Button(button_frame, text="Exit", command=lambda: on_close(), **exit_btn_style)
+    exit_btn = tk.Button(button_frame, text="Exit", command=app.quit, **exit_btn_style)
     exit_btn.grid(row=0, column=2, padx=15)
 
-    root.mainloop()
+    return view, close
+
+def show_start_gui():
+    from app import App, build_parser
+    app = App(build_parser().parse_args())
+    app.show_login()
+    app.run()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,293 @@
+import bisect
+import cProfile
+import json
+import logging
+import logging.handlers
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; covers a cheap render step up to a slow CPU inference.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+    def samples(self):
+        return [(self.name + "_total", self.labels, self.value)]
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.value = 0.0
+        self.fn = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, fn):
+        # Read lazily at scrape time, so hot loops pay nothing for it.
+        self.fn = fn
+
+    def samples(self):
+        value = self.value
+        if self.fn is not None:
+            try:
+                value = self.fn()
+            except Exception:
+                return []
+        return [(self.name, self.labels, float(value))]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+    def samples(self):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        out = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            out.append((self.name + "_bucket", self.labels + (("le", le),), cumulative))
+        out.append((self.name + "_sum", self.labels, total))
+        out.append((self.name + "_count", self.labels, count))
+        return out
+
+
+class Registry:
+    def __init__(self, prefix="drowsiness_"):
+        self.prefix = prefix
+        self.help = {}
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        name = self.prefix + name
+        key = (name, tuple(sorted(labels.items())))
+        metric = self.metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.get(key)
+                if metric is None:
+                    metric = cls(name, key[1], **kwargs)
+                    self.metrics[key] = metric
+                    self.help.setdefault(name, (cls.kind, help))
+        return metric
+
+    def counter(self, name, help="", **labels):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help="", **labels):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help="", buckets=LATENCY_BUCKETS, **labels):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render(self):
+        by_name = {}
+        for (name, _), metric in list(self.metrics.items()):
+            by_name.setdefault(name, []).append(metric)
+        lines = []
+        for name, metrics in by_name.items():
+            kind, help = self.help[name]
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for metric in metrics:
+                for sample, labels, value in metric.samples():
+                    lines.append(f"{sample}{_label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        out = {}
+        for metric in list(self.metrics.values()):
+            for sample, labels, value in metric.samples():
+                if not sample.endswith("_bucket"):
+                    out[sample + _label_text(labels)] = value
+        return out
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+def stage_timer(stage):
+    return REGISTRY.histogram("stage_seconds", "Latency of each processing stage", stage=stage)
+
+
+class Profiler:
+    # cProfile only sees the thread that enabled it, so hot loops wrap their
+    # step in PROFILER.call(): while profiling is off that costs one attribute
+    # check, while on each thread gets its own profile, merged on stop().
+    def __init__(self):
+        self.active = False
+        self.started = None
+        self._profiles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self._profiles = []
+            self.started = time.time()
+            self.active = True
+        print("[metrics] profiling started", flush=True)
+
+    def stop(self, path=None):
+        with self._lock:
+            self.active = False
+            profiles, self._profiles = self._profiles, []
+        self._local = threading.local()
+        if not profiles:
+            return None
+        path = path or time.strftime("profile-%Y%m%d-%H%M%S.prof")
+        stats = pstats.Stats(profiles[0])
+        for p in profiles[1:]:
+            stats.add(p)
+        stats.dump_stats(path)
+        print(f"[metrics] profile written to {path}", flush=True)
+        return path
+
+    def toggle(self):
+        return self.stop() if self.active else self.start()
+
+    def _thread_profile(self):
+        prof = getattr(self._local, "profile", None)
+        if prof is None:
+            prof = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(prof)
+        return prof
+
+    def call(self, fn, *args):
+        if not self.active:
+            return fn(*args)
+        prof = self._thread_profile()
+        prof.enable()
+        try:
+            return fn(*args)
+        finally:
+            prof.disable()
+
+
+PROFILER = Profiler()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._reply(200, REGISTRY.render(), "text/plain; version=0.0.4")
+        elif self.path == "/profile/start":
+            PROFILER.start()
+            self._reply(200, "profiling\n")
+        elif self.path == "/profile/stop":
+            path = PROFILER.stop()
+            self._reply(200, f"{path}\n")
+        else:
+            self._reply(404, "not found\n")
+
+    def _reply(self, code, body, content_type="text/plain"):
+        data = body.encode()
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[metrics] serving http://{host}:{port}/metrics", flush=True)
+    return server
+
+
+class FileExporter(threading.Thread):
+    # Appends one JSON snapshot per interval to a size-rotated log.
+    def __init__(self, path, interval=10.0, max_bytes=5 * 1024 * 1024, backups=3):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.logger = logging.getLogger(f"metrics.{os.path.abspath(path)}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups))
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.logger.info(json.dumps({"ts": time.time(), **REGISTRY.snapshot()}))
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_metrics(opt):
+    if opt.metrics_port:
+        start_http_server(opt.metrics_port)
+    if opt.metrics_file:
+        FileExporter(opt.metrics_file, interval=opt.metrics_interval).start()
+    try:
+        import signal
+        signal.signal(signal.SIGUSR1, lambda *_: PROFILER.toggle())
+    except (AttributeError, ValueError):  # Windows, or not the main thread
+        pass
+
+
+def add_metrics_args(parser):
+    parser.add_argument("--metrics-port", type=int, default=0, help="serve /metrics on this local port (0 = off)")
+    parser.add_argument("--metrics-file", type=str, default=None, help="also append metric snapshots to this rotating file")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between file snapshots")
@@ -0,0 +1,227 @@
+import atexit
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from detection import detections_from_arrays, empty_detections
+
+# spawn everywhere: forking a process that already runs Tk and capture
+# threads is not safe, and it matches Windows behaviour.
+_ctx = mp.get_context("spawn")
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def _frame_view(buf, slot, slot_bytes, shape):
+    return np.ndarray(shape, np.uint8, buffer=buf, offset=slot * slot_bytes)
+
+
+def _worker_main(shm_name, slot_bytes, opt, conn):
+    # Runs in the child: attach to the parent's frame slots, load the model
+    # once and answer predict requests until told to stop.
+    from backends import load_backend
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        backend = load_backend(opt)
+        backend.predict([np.zeros((480, 640, 3), np.uint8)])
+        conn.send(("ready", backend.name, backend.names, time.process_time()))
+        while True:
+            msg = conn.recv()
+            if msg[0] == "stop":
+                break
+            _, imgsz, frames = msg
+            views = [_frame_view(shm.buf, slot, slot_bytes, shape) for slot, shape in frames]
+            dets = backend.predict(views, imgsz=imgsz)
+            # Compact reply: one (N, 6) float32 array of x1, y1, x2, y2, conf,
+            # cls rows plus the row count per frame.
+            sizes = [len(d.cls) for d in dets]
+            rows = [np.column_stack((d.xyxy, d.conf, d.cls)).astype(np.float32) for d in dets if len(d.cls)]
+            data = np.concatenate(rows) if rows else np.empty((0, 6), np.float32)
+            del views
+            conn.send(("ok", data, sizes, time.process_time()))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        shm.close()
+
+
+class InferenceProcess:
+    # One detector in its own interpreter. Frames are copied once into
+    # shared-memory slots owned by this parent object, so only slot numbers
+    # and shapes cross the pipe; detections come back as one small array.
+    def __init__(self, opt, index=0, slots=4, max_size=(1920, 1080), start_timeout=120.0):
+        self.opt = opt
+        self.index = index
+        self.slots = slots
+        self.slot_bytes = max_size[0] * max_size[1] * 3
+        self.start_timeout = start_timeout
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * self.slot_bytes)
+        self.restarts = 0
+        # CPU seconds the children spent serving predicts, kept across
+        # restarts; startup (imports, model load, warm-up) is left out.
+        self.cpu = 0.0
+        self._cpu_base = 0.0
+        self._cpu_ready = 0.0
+        self.names = None
+        self.name = None
+        self.proc = None
+        self.conn = None
+        self._start()
+
+    def _start(self):
+        parent, child = _ctx.Pipe()
+        self.proc = _ctx.Process(target=_worker_main, args=(self.shm.name, self.slot_bytes, self.opt, child),
+                                 name=f"inference-{self.index}", daemon=True)
+        self.proc.start()
+        child.close()
+        self.conn = parent
+        if not self.conn.poll(self.start_timeout):
+            raise RuntimeError(f"inference worker {self.index} did not start")
+        _, backend_name, self.names, self._cpu_ready = self.conn.recv()
+        self.name = f"{backend_name}@proc"
+
+    def restart(self):
+        code = self.proc.exitcode if self.proc is not None else None
+        print(f"[mp_worker] worker {self.index} died (exit code {code}), restarting", flush=True)
+        self.restarts += 1
+        self._cpu_base = self.cpu
+        if self.proc.is_alive():
+            self.proc.terminate()
+        self.proc.join(5.0)
+        self.conn.close()
+        self._start()
+
+    def send(self, frames, imgsz=None):
+        specs = []
+        for slot, frame in enumerate(frames):
+            if frame.nbytes > self.slot_bytes:
+                raise ValueError(f"frame {frame.shape} does not fit the {self.slot_bytes}-byte shared memory slot")
+            _frame_view(self.shm.buf, slot, self.slot_bytes, frame.shape)[:] = frame
+            specs.append((slot, frame.shape))
+        self.conn.send(("predict", imgsz, specs))
+
+    def receive(self, count, timeout=None):
+        try:
+            if timeout is not None and not self.conn.poll(timeout):
+                raise TimeoutError
+            _, data, sizes, cpu = self.conn.recv()
+        except (EOFError, OSError, TimeoutError):
+            # The batch is lost; the caller gets empty detections for it and
+            # the next call goes to a fresh process.
+            self.restart()
+            return [empty_detections() for _ in range(count)]
+        self.cpu = self._cpu_base + cpu - self._cpu_ready
+        return detections_from_arrays(data, sizes, self.names)
+
+    def predict(self, frames, imgsz=None, timeout=30.0):
+        out = []
+        for i in range(0, len(frames), self.slots):
+            chunk = frames[i:i + self.slots]
+            try:
+                self.send(chunk, imgsz)
+            except (BrokenPipeError, OSError):
+                self.restart()
+                out.extend(empty_detections() for _ in chunk)
+                continue
+            out.extend(self.receive(len(chunk), timeout))
+        return out
+
+    def close(self):
+        try:
+            self.conn.send(("stop",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.proc.join(2.0)
+        if self.proc.is_alive():
+            self.proc.terminate()
+        self.conn.close()
+        self.shm.close()
+        self.shm.unlink()
+
+
+class WorkerPool:
+    # Backend-compatible front for several InferenceProcess workers. Each
+    # call borrows the idle workers (at least one) and spreads its frames
+    # over them, so concurrent single-frame callers and multi-camera batches
+    # both keep every process busy.
+    def __init__(self, opt, workers=2, slots=4, max_size=(1920, 1080)):
+        self.workers = [InferenceProcess(opt, i, slots, max_size) for i in range(workers)]
+        self.names = self.workers[0].names
+        self.name = f"{self.workers[0].name}x{workers}"
+        self.imgsz = None if opt.backend == "stub" else opt.imgsz
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+        self._closed = False
+        atexit.register(self.close)
+
+    def _borrow(self, wanted):
+        workers = [self._idle.get()]
+        while len(workers) < wanted:
+            try:
+                workers.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        return workers
+
+    def predict(self, frames, imgsz=None, timeout=30.0):
+        imgsz = imgsz or self.imgsz
+        workers = self._borrow(min(len(frames), len(self.workers)))
+        try:
+            out = []
+            start = 0
+            while start < len(frames):
+                jobs = []
+                per = -(-(len(frames) - start) // len(workers))
+                for worker in workers:
+                    chunk = frames[start:start + min(per, worker.slots)]
+                    if not chunk:
+                        break
+                    try:
+                        worker.send(chunk, imgsz)
+                        jobs.append((worker, len(chunk)))
+                    except (BrokenPipeError, OSError):
+                        worker.restart()
+                        jobs.append((None, len(chunk)))
+                    start += len(chunk)
+                for worker, count in jobs:
+                    if worker is None:
+                        out.extend(empty_detections() for _ in range(count))
+                    else:
+                        out.extend(worker.receive(count, timeout))
+            return out
+        finally:
+            for worker in workers:
+                self._idle.put(worker)
+
+    def cpu_time(self):
+        # process_time() in the parent does not see the workers
+        return sum(w.cpu for w in self.workers)
+
+    def stats(self):
+        return {"workers": len(self.workers), "restarts": sum(w.restarts for w in self.workers)}
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for worker in self.workers:
+            worker.close()
+
+
+def load_inference(opt):
+    from backends import load_backend
+    if not opt.inference_procs:
+        return load_backend(opt)
+    return WorkerPool(opt, workers=opt.inference_procs, max_size=parse_size(opt.max_frame_size))
+
+
+def add_mp_args(parser):
+    parser.add_argument("--inference-procs", type=int, default=0,
+                        help="run the detector in this many worker processes (0 = in the main process)")
+    parser.add_argument("--max-frame-size", type=str, default="1920x1080",
+                        help="largest frame the shared memory slots must hold, WxH")
@@ -0,0 +1,105 @@
+import argparse
+import time
+import cv2
+from db import log_event, init_db, start_event_writer, stop_event_writer
+from pipeline import CaptureThread, LatestQueue, RateMeter
+from fatigue import FatigueEngine, ALARM_ON, ALARM_OFF, LOGGED_EVENTS, event_names
+from backends import add_backend_args
+from mp_worker import add_mp_args, load_inference
+from metrics import PROFILER, add_metrics_args, gauge, start_metrics
+
+
+def parse_source(source):
+    return int(source) if source.isdigit() else source
+
+
+class Cabin:
+    def __init__(self, source, driver):
+        self.source = source
+        self.driver = driver
+        self.cap = cv2.VideoCapture(parse_source(source))
+        self.frames = LatestQueue(1)
+        self.capture = CaptureThread(self.cap, self.frames)
+        self.fatigue = FatigueEngine()
+
+    def start(self):
+        gauge("fatigue_level", "Current fatigue level", driver=self.driver).set_function(lambda: self.fatigue.level)
+        gauge("alarm_on", "1 while the drowsiness alarm is sounding", driver=self.driver).set_function(lambda: self.fatigue.alarm_on)
+        gauge("frame_queue_dropped", "Frames replaced before batching", driver=self.driver).set_function(lambda: self.frames.dropped)
+        self.capture.start()
+        log_event(self.driver, "start_trip")
+
+    def stop(self):
+        self.capture.stop()
+        self.capture.join(1.0)
+        self.cap.release()
+        log_event(self.driver, "stop_trip")
+
+
+def process_batch(cabins, backend, meter):
+    batch = []
+    for cabin in cabins:
+        item = cabin.frames.get_nowait()
+        if item is not None:
+            batch.append((cabin, item[1]))
+    if not batch:
+        return False
+
+    detections = backend.predict([frame for _, frame in batch])
+    ts = time.monotonic()
+    for (cabin, _), det in zip(batch, detections):
+        meter.tick()
+        events = cabin.fatigue.update(ts, det)
+        if events & ALARM_ON:
+            print(f"[ALARM] {cabin.driver} ({cabin.source})", flush=True)
+        if events & ALARM_OFF:
+            print(f"[OK] {cabin.driver} ({cabin.source})", flush=True)
+        for event in event_names(events & LOGGED_EVENTS):
+            log_event(cabin.driver, event)
+    return True
+
+
+def run(cabins, backend, report_every=5.0):
+    meter = RateMeter(report_every)
+    last_report = time.perf_counter()
+    while True:
+        if not PROFILER.call(process_batch, cabins, backend, meter):
+            time.sleep(0.005)
+            continue
+
+        now = time.perf_counter()
+        if now - last_report >= report_every:
+            last_report = now
+            levels = ", ".join(f"{c.driver}={c.fatigue.level:.0f}" for c in cabins)
+            print(f"[STATS] {meter.fps:.1f} frames/s over {len(cabins)} sources | fatigue: {levels}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sources", nargs="+", required=True, help="camera indices, video files or RTSP URLs")
+    parser.add_argument("--drivers", nargs="*", default=[], help="driver name per source")
+    add_backend_args(parser)
+    add_mp_args(parser)
+    add_metrics_args(parser)
+    opt = parser.parse_args()
+
+    drivers = opt.drivers + [f"cabin{i}" for i in range(len(opt.drivers), len(opt.sources))]
+    start_metrics(opt)
+    init_db()
+    start_event_writer()
+    backend = load_inference(opt)
+    cabins = [Cabin(source, driver) for source, driver in zip(opt.sources, drivers)]
+    for cabin in cabins:
+        cabin.start()
+    try:
+        run(cabins, backend)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for cabin in cabins:
+            cabin.stop()
+        stop_event_writer()
+
+
+if __name__ == "__main__":
+    main()
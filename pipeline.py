@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import deque
+from metrics import PROFILER, gauge, stage_timer
+
+PROCESS_SECONDS = stage_timer("process")
+
+
+class LatestQueue:
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            return self._take_newest()
+
+    def get_nowait(self):
+        with self._cond:
+            return self._take_newest()
+
+    def _take_newest(self):
+        if not self._items:
+            return None
+        item = self._items.pop()
+        self.dropped += len(self._items)
+        self._items.clear()
+        return item
+
+    def depth(self):
+        return len(self._items)
+
+
+class RateMeter:
+    def __init__(self, window=1.0):
+        self.window = window
+        self.count = 0
+        self.fps = 0.0
+        self._n = 0
+        self._t0 = time.perf_counter()
+
+    def tick(self):
+        self.count += 1
+        self._n += 1
+        now = time.perf_counter()
+        elapsed = now - self._t0
+        if elapsed >= self.window:
+            self.fps = self._n / elapsed
+            self._n = 0
+            self._t0 = now
+
+
+class CaptureThread(threading.Thread):
+    def __init__(self, cap, out_queue):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.out_queue = out_queue
+        self.meter = RateMeter()
+        self._stop_event = threading.Event()
+
+    def read(self):
+        # Capture services stamp frames when they leave the device; a plain
+        # cv2.VideoCapture is stamped when read() returns.
+        if hasattr(self.cap, "read_stamped"):
+            return self.cap.read_stamped()
+        ret, frame = self.cap.read()
+        return ret, frame, time.perf_counter()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            ret, frame, ts = self.read()
+            if not ret:
+                time.sleep(0.01)
+                continue
+            self.meter.tick()
+            self.out_queue.put((ts, frame))
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class InferenceWorker(threading.Thread):
+    def __init__(self, in_queue, out_queue, process):
+        super().__init__(daemon=True)
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.process = process
+        self.meter = RateMeter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            item = self.in_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            ts, frame = item
+            try:
+                t0 = time.perf_counter()
+                out = PROFILER.call(self.process, frame, ts)
+                PROCESS_SECONDS.observe(time.perf_counter() - t0)
+            except Exception as e:
+                print(f"[ERROR] inference: {e}")
+                continue
+            self.meter.tick()
+            self.out_queue.put((ts, out))
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class Pipeline:
+    def __init__(self, cap, process, queue_size=1):
+        self.frames = LatestQueue(queue_size)
+        self.results = LatestQueue(queue_size)
+        self.capture = CaptureThread(cap, self.frames)
+        self.inference = InferenceWorker(self.frames, self.results, process)
+        self.render_meter = RateMeter()
+        self.latency = 0.0
+
+    def start(self):
+        for name, help in (("capture_fps", "Frames read by the pipeline per second"),
+                           ("inference_fps", "Frames processed per second"),
+                           ("render_fps", "Results displayed per second"),
+                           ("latency_ms", "Smoothed capture-to-display latency"),
+                           ("frame_queue", "Frames waiting for the worker"),
+                           ("result_queue", "Results waiting for display"),
+                           ("frames_dropped", "Frames replaced before the worker took them"),
+                           ("results_dropped", "Results replaced before display")):
+            gauge(f"pipeline_{name}", help).set_function(lambda name=name: self.stats()[name])
+        self.capture.start()
+        self.inference.start()
+
+    def stop(self, timeout=1.0):
+        self.capture.stop()
+        self.inference.stop()
+        for t in (self.capture, self.inference):
+            if t.is_alive():
+                t.join(timeout)
+
+    def latest_result(self):
+        item = self.results.get_nowait()
+        if item is None:
+            return None
+        ts, out = item
+        self.render_meter.tick()
+        # capture-to-display latency, smoothed
+        latency = time.perf_counter() - ts
+        self.latency = latency if not self.latency else 0.9 * self.latency + 0.1 * latency
+        return out
+
+    def stats(self):
+        return {
+            "capture_fps": self.capture.meter.fps,
+            "inference_fps": self.inference.meter.fps,
+            "render_fps": self.render_meter.fps,
+            "latency_ms": self.latency * 1000,
+            "frame_queue": self.frames.depth(),
+            "result_queue": self.results.depth(),
+            "frames_dropped": self.frames.dropped,
+            "results_dropped": self.results.dropped,
+        }
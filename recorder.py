@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import cv2
+import numpy as np
+from metrics import gauge, stage_timer
+
+ENCODE_SECONDS = stage_timer("clip_encode")
+
+
+class ClipRecorder:
+    # Keeps the last `pre_seconds` of frames as downscaled JPEGs in a bounded
+    # ring. trigger() snapshots the ring, keeps collecting for `post_seconds`
+    # and then hands the clip to a background encoder, so the detection loop
+    # only ever pays for one small resize + JPEG encode per kept frame.
+    def __init__(self, directory="clips", pre_seconds=10.0, post_seconds=5.0, fps=10.0, scale=0.5, quality=70):
+        self.directory = directory
+        self.post_seconds = post_seconds
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.scale = scale
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.ring = deque(maxlen=max(1, int(pre_seconds * fps)))
+        self.ring_bytes = 0
+        self.pending = []
+        self.last = 0.0
+        self.clips = 0
+        self.encode_ms = 0.0
+        self._lock = threading.Lock()
+        self._encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip-encoder")
+        gauge("clip_buffer_bytes", "Memory held by the pre-alarm frame ring").set_function(lambda: self.ring_bytes)
+
+    def add(self, frame, ts=None):
+        ts = time.monotonic() if ts is None else ts
+        if ts - self.last < self.interval:
+            return
+        self.last = ts
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", small, self.params)
+        if not ok:
+            return
+        with self._lock:
+            if len(self.ring) == self.ring.maxlen:
+                self.ring_bytes -= len(self.ring[0])
+            self.ring.append(jpeg)
+            self.ring_bytes += len(jpeg)
+            done = []
+            for clip in self.pending:
+                clip[1].append(jpeg)
+                if ts >= clip[2]:
+                    done.append(clip)
+            for clip in done:
+                self.pending.remove(clip)
+                self._encoder.submit(self._encode, clip[0], clip[1])
+
+    def trigger(self, driver, ts=None):
+        # Returns the clip path right away so it can be stored with the
+        # event; the file appears once the post-alarm frames are encoded.
+        ts = time.monotonic() if ts is None else ts
+        name = f"{driver}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            self.pending.append([path, list(self.ring), ts + self.post_seconds])
+        return path
+
+    def _encode(self, path, frames):
+        try:
+            self._write_clip(path, frames)
+        except Exception as e:
+            print(f"[ERROR] recorder: {path}: {e}", flush=True)
+
+    def _write_clip(self, path, frames):
+        if not frames:
+            return
+        t0 = time.perf_counter()
+        os.makedirs(self.directory, exist_ok=True)
+        first = cv2.imdecode(np.frombuffer(frames[0], np.uint8), cv2.IMREAD_COLOR)
+        h, w = first.shape[:2]
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (w, h))
+        try:
+            writer.write(first)
+            for jpeg in frames[1:]:
+                writer.write(cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR))
+        finally:
+            writer.release()
+        elapsed = time.perf_counter() - t0
+        ENCODE_SECONDS.observe(elapsed)
+        self.clips += 1
+        self.encode_ms = elapsed * 1000
+        print(f"[recorder] {path}: {len(frames)} frames encoded in {self.encode_ms:.0f} ms", flush=True)
+
+    def close(self, wait=True):
+        # Clips still collecting post-alarm frames are written with what
+        # they have.
+        with self._lock:
+            pending, self.pending = self.pending, []
+        for clip in pending:
+            self._encoder.submit(self._encode, clip[0], clip[1])
+        self._encoder.shutdown(wait=wait)
+
+    def stats(self):
+        return {"buffer_frames": len(self.ring), "buffer_mb": self.ring_bytes / 1e6,
+                "clips": self.clips, "last_encode_ms": self.encode_ms}
+
+
+def make_recorder(opt):
+    if not opt.record:
+        return None
+    return ClipRecorder(opt.clip_dir, pre_seconds=opt.clip_pre, post_seconds=opt.clip_post, fps=opt.clip_fps)
+
+
+def add_recorder_args(parser):
+    parser.add_argument("--record", action="store_true", help="save a video clip around every fatigue alarm")
+    parser.add_argument("--clip-dir", type=str, default="clips")
+    parser.add_argument("--clip-pre", type=float, default=10.0, help="seconds kept before the alarm")
+    parser.add_argument("--clip-post", type=float, default=5.0, help="seconds recorded after the alarm")
+    parser.add_argument("--clip-fps", type=float, default=10.0, help="frame rate of the saved clips")
@@ -0,0 +1,80 @@
+import time
+import cv2
+import numpy as np
+from PIL import Image
+from pipeline import RateMeter
+from metrics import stage_timer
+
+RENDER_SECONDS = stage_timer("render")
+
+
+def fit_size(width, height, max_size):
+    scale = min(max_size[0] / width, max_size[1] / height, 1.0)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+class Renderer:
+    # Shows BGR frames in a Tk label without per-frame allocations: the frame
+    # is resized and converted into preallocated buffers, a PIL image shares
+    # the RGBA buffer's memory, and one PhotoImage is updated with paste().
+    # With label=None only the conversion runs, for headless benchmarks.
+    def __init__(self, label=None, max_size=(640, 480), max_fps=30.0):
+        self.label = label
+        self.max_size = max_size
+        self.interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.source_shape = None
+        self.small = None
+        self.rgba = None
+        self.image = None
+        self.photo = None
+        self.last = 0.0
+        self.cost = 0.0
+        self.meter = RateMeter()
+
+    def _allocate(self, shape):
+        h, w = shape[:2]
+        dw, dh = fit_size(w, h, self.max_size)
+        self.source_shape = shape
+        self.small = np.empty((dh, dw, 3), np.uint8) if (dw, dh) != (w, h) else None
+        self.rgba = np.empty((dh, dw, 4), np.uint8)
+        self.image = Image.frombuffer("RGBA", (dw, dh), self.rgba, "raw", "RGBA", 0, 1)
+        # a new PhotoImage is created for the new size on the next show()
+        self.photo = None
+
+    def convert(self, frame):
+        if frame.shape != self.source_shape:
+            self._allocate(frame.shape)
+        src = frame
+        if self.small is not None:
+            cv2.resize(frame, (self.small.shape[1], self.small.shape[0]), dst=self.small, interpolation=cv2.INTER_AREA)
+            src = self.small
+        cv2.cvtColor(src, cv2.COLOR_BGR2RGBA, dst=self.rgba)
+        return self.image
+
+    def due(self):
+        return time.perf_counter() - self.last >= self.interval
+
+    def show(self, frame):
+        t0 = time.perf_counter()
+        image = self.convert(frame)
+        if self.label is not None:
+            if self.photo is None:
+                from PIL import ImageTk
+                self.photo = ImageTk.PhotoImage(image)
+                self.label.configure(image=self.photo)
+            else:
+                self.photo.paste(image)
+        self.last = time.perf_counter()
+        # exponential moving average of the display cost
+        cost = self.last - t0
+        RENDER_SECONDS.observe(cost)
+        self.cost = cost if not self.cost else 0.9 * self.cost + 0.1 * cost
+        self.meter.tick()
+
+    def next_delay(self, minimum=5):
+        # ms until the next display slot, for Tk's after()
+        remaining = self.last + self.interval - time.perf_counter()
+        return max(minimum, int(remaining * 1000))
+
+    def stats(self):
+        return {"display_fps": self.meter.fps, "display_ms": self.cost * 1000}
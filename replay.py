@@ -0,0 +1,188 @@
+import argparse
+import glob
+import json
+import os
+import time
+import cv2
+import numpy as np
+from backends import add_backend_args
+from mp_worker import add_mp_args, load_inference
+from detection import analyze_frame, draw_detections, draw_fatigue_bar
+from fatigue import FatigueEngine, event_names
+from scheduler import InferenceScheduler, add_scheduler_args
+from roi import add_roi_args, wrap_backend
+from render import Renderer
+from governor import add_governor_args, make_governor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def synthetic_frames(count, fps=30.0, size=(640, 480)):
+    # Deterministic clip for CI: a bright "awake" face patch that goes dark
+    # ("drowsy") for the middle third of the run.
+    w, h = size
+    for i in range(count):
+        frame = np.full((h, w, 3), 40, np.uint8)
+        level = 30 if count // 3 <= i < 2 * count // 3 else 200
+        cv2.rectangle(frame, (w // 4, h // 4), (3 * w // 4, 3 * h // 4), (level, level, level), -1)
+        cv2.circle(frame, (w // 2 + (i % 20) - 10, h // 2), 20, (level // 2,) * 3, -1)
+        yield i / fps, frame
+
+
+def image_frames(directory, fps):
+    paths = sorted(p for p in glob.glob(os.path.join(directory, "*")) if p.lower().endswith(IMAGE_EXTENSIONS))
+    for i, path in enumerate(paths):
+        frame = cv2.imread(path)
+        if frame is not None:
+            yield i / fps, frame
+
+
+def video_frames(path):
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    i = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield i / fps, frame
+            i += 1
+    finally:
+        cap.release()
+
+
+def open_source(source, fps):
+    if source.startswith("synthetic:"):
+        return synthetic_frames(int(source.split(":", 1)[1]), fps)
+    if os.path.isdir(source):
+        return image_frames(source, fps)
+    return video_frames(source)
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def worker_cpu(backend):
+    # CPU time of --inference-procs workers; RoiBackend wraps the pool
+    backend = getattr(backend, "backend", backend)
+    return backend.cpu_time() if hasattr(backend, "cpu_time") else 0.0
+
+
+def replay(frames, backend, scheduler, fatigue, realtime=False, max_frames=None, draw=True, governor=None):
+    latencies = []
+    display = []
+    renderer = Renderer()
+    timeline = []
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    worker_start = worker_cpu(backend)
+    for index, (ts, frame) in enumerate(frames):
+        if max_frames is not None and index >= max_frames:
+            break
+        if realtime:
+            delay = ts - (time.perf_counter() - wall_start)
+            if delay > 0:
+                time.sleep(delay)
+        t0 = time.perf_counter()
+        det, events = analyze_frame(frame, backend, scheduler, fatigue, ts)
+        if draw:
+            draw_detections(frame, det, backend.names)
+            draw_fatigue_bar(frame, fatigue)
+        t1 = time.perf_counter()
+        latencies.append(t1 - t0)
+        if governor is not None:
+            governor.observe(t1 - t0, now=ts)
+        if draw:
+            # what the GUI would spend preparing this frame for display
+            renderer.convert(frame)
+            display.append(time.perf_counter() - t1)
+        for event in event_names(events):
+            timeline.append({"frame": index, "t": round(ts, 3), "event": event, "fatigue": round(fatigue.level, 2)})
+
+    wall = time.perf_counter() - wall_start
+    worker = worker_cpu(backend) - worker_start
+    cpu = time.process_time() - cpu_start + worker
+    ms = [x * 1000 for x in latencies]
+    report = {
+        "frames": len(latencies),
+        "wall_s": round(wall, 3),
+        "fps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 3),
+            "p90": round(percentile(ms, 90), 3),
+            "p99": round(percentile(ms, 99), 3),
+            "max": round(max(ms), 3) if ms else 0.0,
+        },
+        "display_ms": {
+            "p50": round(percentile([x * 1000 for x in display], 50), 3),
+            "p99": round(percentile([x * 1000 for x in display], 99), 3),
+        },
+        "cpu_percent": round(100.0 * cpu / wall, 1) if wall else 0.0,
+        "worker_cpu_percent": round(100.0 * worker / wall, 1) if wall else 0.0,
+        "inference_ratio": round(scheduler.inference_ratio, 3),
+        "events": timeline,
+    }
+    if governor is not None:
+        report["governor"] = governor.history
+    if hasattr(backend, "roi"):
+        report["roi"] = backend.roi.stats()
+    if resource is not None:
+        # ru_maxrss is KiB on Linux
+        report["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+    return report
+
+
+def print_report(report):
+    lat = report["latency_ms"]
+    print(f"frames      {report['frames']}  in {report['wall_s']} s  ({report['fps']} fps)")
+    print(f"latency ms  p50 {lat['p50']}  p90 {lat['p90']}  p99 {lat['p99']}  max {lat['max']}")
+    disp = report["display_ms"]
+    print(f"display ms  p50 {disp['p50']}  p99 {disp['p99']}")
+    print(f"cpu         {report['cpu_percent']} % ({report['worker_cpu_percent']} % in workers)   max rss {report.get('max_rss_mb', 'n/a')} MB")
+    print(f"inferred    {report['inference_ratio']:.0%} of frames")
+    if "roi" in report:
+        print("roi         " + "  ".join(f"{k} {v}" for k, v in report["roi"].items()))
+    for e in report["events"]:
+        print(f"  {e['t']:9.3f}s  frame {e['frame']:6d}  {e['event']:<18} fatigue={e['fatigue']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded frames through the detection and fatigue loop")
+    parser.add_argument("--source", required=True, help="video file, image directory or synthetic:N")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate assumed for image directories and synthetic input")
+    parser.add_argument("--realtime", action="store_true", help="pace frames at the source frame rate instead of as fast as possible")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--no-draw", action="store_true", help="skip the overlay drawing")
+    parser.add_argument("--json", type=str, default=None, help="write the report to this file")
+    add_backend_args(parser)
+    add_scheduler_args(parser)
+    add_mp_args(parser)
+    add_roi_args(parser)
+    add_governor_args(parser)
+    opt = parser.parse_args()
+
+    backend = wrap_backend(load_inference(opt), opt)
+    # Frame timestamps come from the source, so the fatigue timing matches
+    # the live run no matter how fast the replay goes.
+    fatigue = FatigueEngine(ts=0.0)
+    scheduler = InferenceScheduler(interval=opt.infer_interval, motion_threshold=opt.motion_thres,
+                                   alarm_ratio=fatigue.alarm_ratio)
+    governor = make_governor(opt, scheduler, backend)
+    report = replay(open_source(opt.source, opt.fps), backend, scheduler, fatigue,
+                    realtime=opt.realtime, max_frames=opt.max_frames, draw=not opt.no_draw, governor=governor)
+    report["backend"] = backend.name
+    print_report(report)
+    if opt.json:
+        with open(opt.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
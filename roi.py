@@ -0,0 +1,133 @@
+import cv2
+import numpy as np
+
+
+def locate_faces(small_bgr):
+    import face_recognition
+    rgb = cv2.cvtColor(small_bgr, cv2.COLOR_BGR2RGB)
+    # (top, right, bottom, left) -> (x1, y1, x2, y2)
+    return [(left, top, right, bottom) for top, right, bottom, left in face_recognition.face_locations(rgb)]
+
+
+class FaceRoi:
+    # Finds the driver's face on a downscaled frame, then follows it with a
+    # template match around the last position. A full face detection only
+    # runs again when the match score drops or every `redetect_every` frames.
+    def __init__(self, scale=0.25, pad=0.5, min_score=0.6, redetect_every=60, locate=None):
+        self.scale = scale
+        self.pad = pad
+        self.min_score = min_score
+        self.redetect_every = redetect_every
+        self.locate = locate or locate_faces
+        self.detections = 0
+        self.tracked = 0
+        self.misses = 0
+        self.reset()
+
+    def reset(self):
+        self.template = None
+        self.small_box = None
+        self.score = 0.0
+        self.since_detect = 0
+
+    def _small(self, frame):
+        return cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+    def _detect(self, small, gray):
+        self.detections += 1
+        self.since_detect = 0
+        faces = self.locate(small)
+        if not faces:
+            self.reset()
+            self.misses += 1
+            return None
+        # The driver is the largest face in the cabin camera.
+        x1, y1, x2, y2 = max(faces, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]))
+        self.small_box = (x1, y1, x2, y2)
+        self.template = gray[y1:y2, x1:x2].copy()
+        self.score = 1.0
+        return self.small_box
+
+    def _track(self, gray):
+        x1, y1, x2, y2 = self.small_box
+        w, h = x2 - x1, y2 - y1
+        sx1, sy1 = max(0, x1 - w // 2), max(0, y1 - h // 2)
+        sx2, sy2 = min(gray.shape[1], x2 + w // 2), min(gray.shape[0], y2 + h // 2)
+        window = gray[sy1:sy2, sx1:sx2]
+        if window.shape[0] < h or window.shape[1] < w:
+            return None
+        scores = cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        self.score = score
+        if score < self.min_score:
+            return None
+        self.tracked += 1
+        self.small_box = (sx1 + dx, sy1 + dy, sx1 + dx + w, sy1 + dy + h)
+        return self.small_box
+
+    def update(self, frame):
+        small = self._small(frame)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        self.since_detect += 1
+        box = None
+        if self.template is not None and self.since_detect < self.redetect_every:
+            box = self._track(gray)
+        if box is None:
+            box = self._detect(small, gray)
+        if box is None:
+            return None
+
+        # Back to full resolution with padding, so the detector still sees
+        # the whole head when the driver nods or turns.
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = (v / self.scale for v in box)
+        px, py = (x2 - x1) * self.pad, (y2 - y1) * self.pad
+        return (max(0, int(x1 - px)), max(0, int(y1 - py)), min(w, int(x2 + px)), min(h, int(y2 + py)))
+
+    def stats(self):
+        return {"face_detections": self.detections, "tracked_frames": self.tracked,
+                "face_misses": self.misses, "track_score": round(self.score, 3)}
+
+
+class RoiBackend:
+    # Wraps a detector backend so it only sees the padded face crop at a
+    # smaller input size; boxes come back in full-frame coordinates. Frames
+    # with no face found fall through to the full-frame model.
+    def __init__(self, backend, roi, imgsz=320):
+        self.backend = backend
+        self.roi = roi
+        self.imgsz = imgsz
+        self.names = backend.names
+        self.name = f"{backend.name}+roi"
+
+    def predict(self, frames, imgsz=None):
+        out = [None] * len(frames)
+        crops, offsets, crop_idx, full_idx = [], [], [], []
+        for i, frame in enumerate(frames):
+            box = self.roi.update(frame)
+            if box is None:
+                full_idx.append(i)
+                continue
+            x1, y1, x2, y2 = box
+            crops.append(frame[y1:y2, x1:x2])
+            offsets.append((x1, y1, x1, y1))
+            crop_idx.append(i)
+
+        if crops:
+            for i, det, offset in zip(crop_idx, self.backend.predict(crops, imgsz=self.imgsz), offsets):
+                out[i] = det._replace(xyxy=det.xyxy + np.array(offset, np.int32))
+        if full_idx:
+            for i, det in zip(full_idx, self.backend.predict([frames[i] for i in full_idx], imgsz=imgsz)):
+                out[i] = det
+        return out
+
+
+def wrap_backend(backend, opt):
+    if not opt.roi:
+        return backend
+    return RoiBackend(backend, FaceRoi(), imgsz=opt.roi_imgsz)
+
+
+def add_roi_args(parser):
+    parser.add_argument("--roi", action="store_true", help="run the detector on a tracked face crop instead of the full frame")
+    parser.add_argument("--roi-imgsz", type=int, default=320, help="model input size for the face crop")
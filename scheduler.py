@@ -0,0 +1,70 @@
+import cv2
+from pipeline import RateMeter
+
+
+class InferenceScheduler:
+    def __init__(self, interval=3, motion_threshold=6.0, alarm_ratio=0.75, alarm_margin=0.2, probe_size=(64, 48)):
+        self.interval = interval
+        self.motion_threshold = motion_threshold
+        self.alarm_ratio = alarm_ratio
+        self.alarm_margin = alarm_margin
+        self.probe_size = probe_size
+        self.last = None
+        self.motion = 0.0
+        self.frames = 0
+        self.inferences = 0
+        self.meter = RateMeter()
+        self._reference = None
+        self._since_inference = 0
+
+    def _probe(self, frame):
+        small = cv2.resize(frame, self.probe_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def should_infer(self, frame, fatigue_ratio):
+        probe = self._probe(frame)
+        if self._reference is not None:
+            # Compared against the frame of the last inference so slow drift
+            # accumulates instead of hiding between consecutive frames.
+            self.motion = float(cv2.absdiff(probe, self._reference).mean())
+        due = (
+            self.last is None
+            or self._since_inference >= self.interval
+            or self.motion > self.motion_threshold
+            or fatigue_ratio >= self.alarm_ratio - self.alarm_margin
+        )
+        if due:
+            self._reference = probe
+        return due
+
+    def run(self, frame, fatigue_ratio, infer):
+        self.frames += 1
+        if self.should_infer(frame, fatigue_ratio):
+            self.last = infer(frame)
+            self.inferences += 1
+            self._since_inference = 1
+            self.meter.tick()
+        else:
+            self._since_inference += 1
+        return self.last
+
+    def reset(self):
+        self.last = None
+        self._reference = None
+        self._since_inference = 0
+
+    @property
+    def inference_ratio(self):
+        return self.inferences / self.frames if self.frames else 0.0
+
+    def stats(self):
+        return {
+            "inference_rate": self.meter.fps,
+            "inference_ratio": self.inference_ratio,
+            "motion": self.motion,
+        }
+
+
+def add_scheduler_args(parser):
+    parser.add_argument("--infer-interval", type=int, default=3, help="run the model every k-th frame when the scene is still")
+    parser.add_argument("--motion-thres", type=float, default=6.0, help="mean frame difference that forces inference")
@@ -0,0 +1,34 @@
+import threading
+import time
+from contextlib import contextmanager
+
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    def __init__(self):
+        self.phases = []
+        self.marks = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append((name, time.perf_counter() - t0, threading.current_thread().name))
+
+    def mark(self, name):
+        with self._lock:
+            self.marks.append((name, time.perf_counter() - PROCESS_START))
+
+    def report(self):
+        with self._lock:
+            lines = ["[startup] phase timings:"]
+            for name, seconds, thread in self.phases:
+                lines.append(f"[startup]   {name:<22} {seconds * 1000:8.1f} ms  ({thread})")
+            for name, seconds in self.marks:
+                lines.append(f"[startup]   {name:<22} {seconds * 1000:8.1f} ms  since process start")
+        print("\n".join(lines), flush=True)